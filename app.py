@@ -1,11 +1,22 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-import re
 import time
 from datetime import datetime
 
+import pandas as pd
+
+from counterfactual import LABELS, minimal_change
+from drift_monitor import monitor_from_files
+from engine import BUNDLE_DIR, DECISION_THRESHOLD, MODEL_PATH, risk_level
+from history_store import HISTORY_DB, HistoryStore
+from instrumentation import METRICS, start_from_env
+from model_reload import ModelWatcher, model_source
+from report_templates import DATE_FORMAT, precompile, render_action_items, render_report, render_summary
+from score_cache import ScoreCache
+from text_normalize import MAX_TEXT_CHARS
+
+# How often the background watcher checks the model file for a new version
+MODEL_POLL_SECONDS = 5.0
+
 # ==========================================
 # 1. PREMIUM PAGE CONFIGURATION
 # ==========================================
@@ -308,27 +319,34 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def display_premium_header():
+    st.markdown("""
+    <div class="premium-header animate-in">
+        <div class="brand-title">⚡ Valkyrie AI</div>
+        <p class="brand-subtitle">Premium Student Success Platform · AI-Powered Risk Assessment & Counseling</p>
+    </div>
+    """, unsafe_allow_html=True)
+
 # ==========================================
 # 2. MODEL LOADING WITH ERROR HANDLING
 # ==========================================
 @st.cache_resource
-def load_premium_models():
-    try:
-        with st.spinner("🚀 Initializing Valkyrie AI Premium Engine..."):
-            time.sleep(2)
-            
-        bundle = joblib.load('student_risk_model.pkl')
-        
-        # Validate required components
-        required_keys = ['final_model', 'nlp_model', 'nlp_vectorizer']
-        missing_keys = [key for key in required_keys if key not in bundle]
-        
-        if missing_keys:
-            st.error(f"Missing premium model components: {missing_keys}")
-            return None
-            
-        return bundle
-    except FileNotFoundError:
+def load_model_watcher():
+    """Process-wide model holder; loads the model on a background thread, then swaps in new versions as they are deployed"""
+    # Build all 32 report bodies once per process
+    precompile()
+    
+    # Per-stage metrics endpoint and file writer, when enabled via VALKYRIE_METRICS*
+    start_from_env()
+    
+    # Prefers the exported memory-mapped bundle when it has been deployed. The load, validation
+    # and warmup (including the SHAP explainer) run in the background while the UI renders
+    return ModelWatcher(model_source(MODEL_PATH, BUNDLE_DIR), poll_seconds=MODEL_POLL_SECONDS,
+                        cache_factory=ScoreCache, background=True, explain=True)
+
+def show_model_error(error):
+    """Error card for a model that failed to load"""
+    if isinstance(error, FileNotFoundError):
         st.error("""
         <div class="premium-card" style="border-color: var(--danger-red); background: rgba(239, 68, 68, 0.05);">
             <h3 style="color: var(--danger-red); margin: 0;">🚨 Premium Model File Not Found</h3>
@@ -336,200 +354,154 @@ def load_premium_models():
             <p style="margin: 0; font-size: 0.9rem; color: var(--neutral-600);">Premium Support: premium@valkyrie-ai.com</p>
         </div>
         """, unsafe_allow_html=True)
-        return None
-    except Exception as e:
+    else:
         st.error(f"""
         <div class="premium-card">
             <h3 style="color: var(--danger-red); margin: 0;">⚠️ Premium Engine Error</h3>
-            <p style="margin: 0.5rem 0;">{str(e)}</p>
+            <p style="margin: 0.5rem 0;">{str(error)}</p>
             <p style="margin: 0; font-size: 0.9rem; color: var(--neutral-600);">Technical team has been notified automatically.</p>
         </div>
         """, unsafe_allow_html=True)
+
+@st.cache_resource
+def load_drift_monitor():
+    """Process-wide drift counters against drift_profile.json, or None until a profile is exported"""
+    try:
+        return monitor_from_files()
+    except Exception as e:
+        st.warning(f"Drift monitoring unavailable: {e}")
+        return None
+
+def load_premium_models():
+    """The current engine, read once per run so a reload never changes models mid-assessment.
+
+    Blocks (with a spinner) only if the background warmup has not finished yet.
+    """
+    watcher = load_model_watcher()
+    try:
+        if watcher.ready:
+            engine = watcher.wait()
+        else:
+            with st.spinner("🚀 Initializing Valkyrie AI Premium Engine..."):
+                engine = watcher.wait()
+    except Exception as e:
+        show_model_error(e)
+        return None
+    # Hot-reloaded engines pick up the same monitor on their first run
+    engine.drift = load_drift_monitor()
+    return engine
+
+@st.cache_resource
+def load_history_store():
+    """Process-wide assessment history; writes are batched on a background thread"""
+    try:
+        return HistoryStore(HISTORY_DB)
+    except Exception as e:
+        st.warning(f"Assessment history unavailable: {e}")
         return None
 
 # ==========================================
 # 3. CORE PROCESSING FUNCTIONS
 # ==========================================
-def clean_text(text):
-    """Clean and process text input"""
-    if not isinstance(text, str): 
-        return ""
-    text = text.lower()
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def calculate_features(input_df, nlp_score):
-    """Calculate engineered features for the model"""
-    df = input_df.copy()
-    df['nlp_stress_score'] = nlp_score
-    
-    # Academic Index
-    df['academic_index'] = ((df['previous_sem_gpa'] * 10) + df['last_test_score']) / 2
-    
-    # Sleep Deviation
-    df['sleep_deviation'] = abs(df['sleep_hours_avg'] - 8)
-    
-    # Focus Ratio
-    df['focus_ratio'] = df['avg_daily_study_hours'] / (df['social_media_hours_per_day'] + 1)
-    
-    # Risk Alarm
-    df['risk_alarm'] = np.where((df['is_backlog'] == 1) & (df['attendance_pct'] < 75), 1, 0)
-    
-    # Expected column order - CONSISTENT WITH YOUR MODEL
-    expected_cols = [
-        'attendance_pct', 'sleep_hours_avg', 'avg_daily_study_hours',
-        'avg_weekly_library_hours', 'previous_sem_gpa', 'last_test_score',
-        'social_media_hours_per_day', 'extracurricular_engagement_score',
-        'nlp_stress_score', 'is_backlog', 'sleep_deviation',
-        'academic_index', 'focus_ratio', 'risk_alarm'
-    ]
-    
-    return df[expected_cols]
-
 def generate_professional_plan(risk_drivers, name, risk_prob):
     """Generate professional 4-week plan with clean formatting"""
-    
-    plan = f"""
-╔══════════════════════════════════════════════════════════════════════════════╗
-║                    VALKYRIE AI - PROFESSIONAL COUNSELING REPORT              ║
-╠══════════════════════════════════════════════════════════════════════════════╣
-║ Student: {name:<50} ║
-║ Risk Level: {'HIGH' if risk_prob > 0.6 else 'MEDIUM' if risk_prob > 0.3 else 'LOW':<49} ║
-║ Risk Score: {f"{risk_prob:.1%}":<48} ║
-║ Generated: {datetime.now().strftime('%B %d, %Y'):<47} ║
-╚══════════════════════════════════════════════════════════════════════════════╝
-
-WEEK 1: FOUNDATION & STABILIZATION
-====================================
-Focus: Establishing core habits and immediate risk mitigation
-
-DAILY PROTOCOLS:
-"""
-    if 'Sleep' in risk_drivers:
-        plan += "• Sleep Optimization: 10-3-2-1 Rule (No caffeine 10h before, food 3h, work 2h, screens 1h)\n"
-        plan += "• Target: 8 hours consistent sleep schedule (11 PM - 7 AM)\n"
-    else:
-        plan += "• Maintain optimal sleep schedule and track sleep quality\n"
-    
-    if 'Stress' in risk_drivers:
-        plan += "• Stress Management: 15-minute morning meditation + evening journaling\n"
-        plan += "• Use 4-7-8 breathing technique before study sessions\n"
-    
-    if 'Backlogs/Attendance' in risk_drivers:
-        plan += "• Emergency Protocol: Meet with course coordinator within 48 hours\n"
-        plan += "• Attendance Recovery: Set 5 alarms, find accountability partner\n"
-    
-    plan += f"""
-ACADEMIC FOCUS:
-• Minimum {6 if 'Grades' in risk_drivers else 4} hours daily focused study
-• Active recall sessions every 2 hours
-• Weekly review with study group
-
-WELLNESS INTEGRATION:
-• 30 minutes physical activity (walking counts)
-• 2L water daily minimum
-• Digital sunset: No screens after 10 PM
-
-SUCCESS METRICS:
-□ Attendance improved by 10%
-□ Sleep deviation < 1 hour
-□ Stress self-rating reduced by 2 points
-□ Study hours increased by 1 hour daily
-
-WEEK 2: ACCELERATION & CONSISTENCY
-====================================
-Focus: Building momentum and establishing routines
+    return render_report(risk_drivers, name, risk_prob)
 
-ADVANCED STRATEGIES:
-"""
-    if 'Focus' in risk_drivers:
-        plan += "• Digital Detox: Social media limited to 30 minutes daily\n"
-        plan += "• Pomodoro Mastery: 50min study + 10min break cycles\n"
-        plan += "• Distraction Elimination: Study phone in separate room\n"
-    
-    if 'Grades' in risk_drivers:
-        plan += "• Academic Intensive: Past paper analysis (2 papers/week)\n"
-        plan += "• Professor Office Hours: Minimum 2 visits this week\n"
-        plan += "• Concept Mapping: Visual learning for complex topics\n"
-    
-    plan += f"""
-OPTIMIZATION TECHNIQUES:
-• Spaced repetition schedule implementation
-• Feynman technique: Teach concepts to study buddy
-• Mind mapping for subject interconnections
-• Weekly performance review and adjustment
+def assessment_key(name, student_id, raw_data, diary_entry, model_version):
+    """Identity of one submitted input vector; reruns with the same key reuse the stored results"""
+    return (name, student_id, tuple(raw_data.items()), diary_entry, model_version)
 
-LIFESTYLE UPGRADES:
-• Meal prep for consistent nutrition
-• Morning routine optimization (30-min buffer)
-• Evening wind-down ritual establishment
-• Weekend recovery planning
-
-MILESTONE TARGETS:
-□ Clear 50% of identified backlogs
-□ Focus ratio improved by 25%
-□ Academic index increased by 10 points
-□ Consistency streak: 7-day habit formation
-
-WEEK 3: MASTERY & OPTIMIZATION
-===============================
-Focus: Peak performance and skill refinement
-
-ADVANCED PROTOCOLS:
-"""
-    plan += "• Peak Performance: Identify and replicate your optimal study conditions\n"
-    plan += "• Speed Learning: 2x video playback with active note-taking\n"
-    plan += "• Memory Palace: Implement for complex information retention\n"
-    plan += "• Mock Examination: Full practice test under exam conditions\n"
-    
-    if 'Stress' in risk_drivers:
-        plan += "• Stress Inoculation: Gradual exposure to pressure situations\n"
-        plan += "• Cognitive Behavioral Techniques: Challenge negative thought patterns\n"
-    
-    plan += """
-PERFORMANCE METRICS:
-□ Mock exam score improvement: Target 75%+
-□ Study efficiency: 90%+ retention rate
-□ Stress management: Maintain <4/10 daily
-□ Network expansion: 3 new academic connections
-
-WEEK 4: CONSOLIDATION & FUTURE-PROOFING
-========================================
-Focus: Maintaining gains and building sustainable systems
+def run_assessment(models, name, student_id, raw_data, diary_entry, history=None):
+    """Score one student and build everything the results page renders"""
+    with METRICS.trace(student_id=student_id, model_version=models.model_version):
+        scored = models.score_one(raw_data, diary_entry)
+    nlp_prob = scored['nlp_prob']
+    risk_prob = scored['risk_prob']
+    final_input = scored['features']
+    
+    # Earlier assessments for the trend chart, then queue this one (non-blocking)
+    trend = None
+    if history is not None:
+        trend = history.student_history(student_id, columns=['scored_at', 'risk_prob'])
+        trend.loc[len(trend)] = [pd.to_datetime(time.time(), unit='s'), risk_prob]
+        history.record(student_id, risk_prob, final_input, name=name,
+                       model_version=scored['model_version'], risk_level=scored['risk_level'])
+    
+    # TreeSHAP contributions per driver category (log-odds, before calibration)
+    category_contributions = models.explainer.category_contributions(final_input)
+    contributions = category_contributions.iloc[0]
+    risk_drivers = models.explainer.drivers_from_contributions(category_contributions)[0]
+    
+    # What-if analysis: smallest change that brings risk under the decision threshold
+    scenario = None if risk_prob < DECISION_THRESHOLD else minimal_change(models, raw_data, nlp_prob)
+    
+    generated = datetime.now()
+    professional_plan = generate_professional_plan(risk_drivers, name, risk_prob)
+    
+    summary = render_summary(risk_drivers, name, risk_prob, scored['model_version'], generated.strftime(DATE_FORMAT))
+    
+    return {
+        'key': assessment_key(name, student_id, raw_data, diary_entry, scored['model_version']),
+        'name': name,
+        'student_id': student_id,
+        'raw_data': raw_data,
+        'risk_prob': risk_prob,
+        'nlp_prob': nlp_prob,
+        'academic_index': final_input['academic_index'][0],
+        'focus_ratio': final_input['focus_ratio'][0],
+        'final_input': final_input,
+        'driver_contributions': contributions,
+        'risk_drivers': risk_drivers,
+        'scenario': scenario,
+        'professional_plan': professional_plan,
+        'summary': summary,
+        'action_items': render_action_items(risk_drivers, name),
+        'generated': generated,
+        'model_version': scored['model_version'],
+        'trend': trend,
+    }
 
-SUSTAINABILITY PROTOCOLS:
-• System Automation: Create habits that run on autopilot
-• Relapse Prevention: Identify triggers and create counter-strategies
-• Performance Monitoring: Weekly self-assessment routine
-• Continuous Improvement: Monthly optimization reviews
+def display_premium_analysis(results_package):
+    """Render the metric cards and risk drivers; returns the driver categories for the plan"""
+    risk_prob = results_package['risk_prob']
+    contributions = results_package['driver_contributions']
+    risk_drivers = results_package['risk_drivers']
 
-LONG-TERM STRATEGIES:
-• Advanced course planning for next semester
-• Scholarship and opportunity identification
-• Research project initiation
-• Leadership role development
+    level = risk_level(risk_prob)
 
-FINAL ASSESSMENT TARGETS:
-□ Risk probability reduced by 50%
-□ Academic index: 80+ (Excellent range)
-□ Consistency score: 95%+ daily completion
-□ Stress level: <3/10 sustained
-□ Network: 10+ academic connections
-□ Leadership: 1 initiative started
+    st.markdown("### 📊 Risk Assessment")
+    cards = [
+        ("Risk Score", f"{risk_prob:.1%}", f"{level} RISK"),
+        ("Stress Signal", f"{results_package['nlp_prob']:.1%}", "Journal NLP"),
+        ("Academic Index", f"{results_package['academic_index']:.2f}", "GPA & Test Blend"),
+        ("Focus Ratio", f"{results_package['focus_ratio']:.2f}", "Study / Social"),
+    ]
+    for column, (label, value, status) in zip(st.columns(4), cards):
+        with column:
+            st.markdown(f"""
+            <div class="metric-card-premium animate-in">
+                <p class="metric-label">{label}</p>
+                <div class="metric-value">{value}</div>
+                <span class="metric-status">{status}</span>
+            </div>
+            """, unsafe_allow_html=True)
 
-NEXT STEPS:
-• Graduate to Advanced Performance Coaching (APC-90 Program)
-• Consider Research Excellence Track (RET-100)
-• Explore Leadership Development Intensive (LDI-85)
-• Plan Career Acceleration Protocol (CAP-95)
+    st.markdown("### 🎯 Key Risk Drivers")
+    if not risk_drivers:
+        st.markdown("""
+        <div class="risk-indicator risk-low">
+            <strong>No significant risk drivers</strong> — every area is at or better than the typical student.
+        </div>
+        """, unsafe_allow_html=True)
+    for driver in risk_drivers:
+        css = 'risk-critical' if contributions[driver] > 0.5 else 'risk-high' if contributions[driver] > 0.2 else 'risk-medium'
+        st.markdown(f"""
+        <div class="risk-indicator {css}">
+            <strong>{driver}</strong> — raises risk by {contributions[driver]:+.2f} log-odds
+        </div>
+        """, unsafe_allow_html=True)
 
-Stay exceptional,
-The Valkyrie AI Team
-"""
-    
-    return report
+    return risk_drivers
 
 # ==========================================
 # 4. PREMIUM SIDEBAR
@@ -611,6 +583,7 @@ def premium_sidebar():
             diary_entry = st.text_area("How are you feeling today?", 
                                      "I feel overwhelmed with the upcoming exams and assignments.",
                                      height=120,
+                                     max_chars=MAX_TEXT_CHARS,
                                      help="Our AI will analyze your emotional state",
                                      placeholder="Share your thoughts, feelings, and concerns...")
             
@@ -624,136 +597,142 @@ def premium_sidebar():
 # ==========================================
 # 5. MAIN APPLICATION
 # ==========================================
+def display_assessment(results):
+    """Render a stored assessment: analysis, what-if, plan, downloads and footer"""
+    name = results['name']
+    risk_prob = results['risk_prob']
+    
+    # Display premium analysis
+    display_premium_analysis(results)
+    
+    trend = results['trend']
+    if trend is not None and len(trend) > 1:
+        st.markdown("### 📈 Risk Trend")
+        st.line_chart(trend.set_index('scored_at')['risk_prob'])
+    
+    st.markdown("---")
+    st.markdown("### 🔮 What-If Analysis")
+    
+    scenario = results['scenario']
+    if scenario is None:
+        st.success(f"Risk is already below the {DECISION_THRESHOLD:.1%} decision threshold.")
+    else:
+        changes = "\n".join(
+            f"- **{LABELS[col]}**: {old:g} → {new:g}" for col, (old, new) in scenario['changes'].items()
+        )
+        if scenario['reaches_threshold']:
+            st.markdown(f"Smallest change out of {scenario['scenarios']:,} scenarios that brings risk "
+                        f"from **{scenario['baseline_risk']:.1%}** to **{scenario['risk_prob']:.1%}**:\n\n{changes}")
+        else:
+            st.markdown(f"None of the {scenario['scenarios']:,} scenarios gets below {DECISION_THRESHOLD:.1%}; "
+                        f"the best one lowers risk to **{scenario['risk_prob']:.1%}**:\n\n{changes}")
+    
+    # Professional report section
+    st.markdown("---")
+    st.markdown("### 📋 Professional 4-Week Transformation Plan")
+    
+    # Display in professional container
+    st.markdown(f"""
+    <div class="premium-report animate-in">
+        <pre style="margin: 0; font-family: 'JetBrains Mono', monospace; font-size: 0.85rem; line-height: 1.5;">{results['professional_plan']}</pre>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Professional download options
+    st.markdown("---")
+    st.markdown("### 💾 Download Your Professional Report")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.download_button(
+            label="📄 Download Full Report",
+            data=results['professional_plan'],
+            file_name=f"{name.replace(' ', '_')}_Valkyrie_Professional_Report_{results['generated'].strftime('%Y%m%d')}.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+    
+    with col2:
+        st.download_button(
+            label="📊 Download Executive Summary",
+            data=results['summary'],
+            file_name=f"{name.replace(' ', '_')}_Executive_Summary.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+    
+    with col3:
+        st.download_button(
+            label="✅ Download Action Items",
+            data=results['action_items'],
+            file_name=f"{name.replace(' ', '_')}_Action_Items.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+    
+    # Professional footer
+    st.markdown(f"""
+    <div style="text-align: center; padding: 2rem; background: white; border-radius: 16px; margin-top: 2rem; box-shadow: var(--shadow-sm); border: 1px solid var(--neutral-200);">
+        <h3 style="color: var(--primary-blue); margin: 0 0 1rem 0; font-weight: 600;">🎓 Valkyrie AI Professional Platform</h3>
+        <p style="color: var(--neutral-600); margin: 0; font-size: 1rem; line-height: 1.6;">
+            Advanced machine learning meets educational psychology for unprecedented student success outcomes.
+        </p>
+        <p style="color: var(--neutral-500); margin: 1rem 0 0 0; font-size: 0.9rem;">
+            For professional support: support@valkyrie-ai.com | Available 24/7 for student success
+        </p>
+        <p style="color: var(--neutral-500); margin: 0.5rem 0 0 0; font-size: 0.8rem;">
+            Scored by model {results['model_version']}
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
 def main():
     # Display premium header
     display_premium_header()
     
-    # Load models with premium UI
-    models = load_premium_models()
-    if models is None:
+    # Starts the model load and warmup in the background on the first run of the process
+    watcher = load_model_watcher()
+    if watcher.ready and watcher.load_error is not None:
+        show_model_error(watcher.load_error)
         st.stop()
     
     # Premium sidebar
     submitted, name, student_id, gpa, test_score, backlog, attendance, library_hrs, extra_score, study_hrs, social_hrs, sleep_hrs, stress_level, diary_entry = premium_sidebar()
     
-    # Main analysis area
-    if submitted:
+    # Only a submit needs the model; this waits for the warmup if it is still running
+    models = load_premium_models() if submitted else None
+    if submitted and models is None:
+        st.stop()
+    
+    # Main analysis area. Results live in session state, so reruns triggered by the
+    # download buttons (where submitted is False) re-render them without rescoring.
+    if submitted or 'assessment' in st.session_state:
         try:
-            # Premium loading experience
-            with st.spinner("🧠 Valkyrie AI Analyzing Your Profile..."):
-                time.sleep(2)  # Premium feel
+            if submitted:
+                # Prepare premium data - ONLY FEATURES THAT EXIST IN YOUR MODEL
+                raw_data = {
+                    'previous_sem_gpa': gpa,
+                    'attendance_pct': attendance,
+                    'avg_daily_study_hours': study_hrs,
+                    'social_media_hours_per_day': social_hrs,
+                    'sleep_hours_avg': sleep_hrs,
+                    'last_test_score': test_score,
+                    'is_backlog': 1 if backlog == "Yes" else 0,
+                    'avg_weekly_library_hours': library_hrs,
+                    'extracurricular_engagement_score': extra_score
+                }
                 
-            # Process inputs with premium validation
-            cleaned_diary = clean_text(diary_entry)
-            vec_text = models['nlp_vectorizer'].transform([cleaned_diary])
-            nlp_prob = models['nlp_model'].predict_proba(vec_text)[0][1]
+                key = assessment_key(name, student_id, raw_data, diary_entry, models.model_version)
+                stored = st.session_state.get('assessment')
+                if stored is None or stored['key'] != key:
+                    # Premium loading experience
+                    with st.spinner("🧠 Valkyrie AI Analyzing Your Profile..."):
+                        st.session_state['assessment'] = run_assessment(models, name, student_id, raw_data,
+                                                                        diary_entry, load_history_store())
+                    watcher.record_result()
             
-            # Prepare premium data - ONLY FEATURES THAT EXIST IN YOUR MODEL
-            raw_data = pd.DataFrame({
-                'previous_sem_gpa': [gpa],
-                'attendance_pct': [attendance],
-                'avg_daily_study_hours': [study_hrs],
-                'social_media_hours_per_day': [social_hrs],
-                'sleep_hours_avg': [sleep_hrs],
-                'last_test_score': [test_score],
-                'is_backlog': [1 if backlog == "Yes" else 0],
-                'avg_weekly_library_hours': [library_hrs],
-                'extracurricular_engagement_score': [extra_score]
-            })
-            
-            final_input = calculate_features(raw_data, nlp_prob)
-            risk_prob = models['final_model'].predict_proba(final_input)[0][1]
-            
-            # Prepare results package
-            results_package = {
-                'name': name,
-                'risk_prob': risk_prob,
-                'academic_index': final_input['academic_index'][0],
-                'nlp_prob': nlp_prob,
-                'focus_ratio': final_input['focus_ratio'][0],
-                'final_input': final_input,
-                'models': models
-            }
-            
-            # Display premium analysis
-            risk_drivers = display_premium_analysis(results_package)
-            
-            # Professional report section
-            st.markdown("---")
-            st.markdown("### 📋 Professional 4-Week Transformation Plan")
-            
-            professional_plan = generate_professional_plan(risk_drivers, name, risk_prob)
-            
-            # Display in professional container
-            st.markdown(f"""
-            <div class="premium-report animate-in">
-                <pre style="margin: 0; font-family: 'JetBrains Mono', monospace; font-size: 0.85rem; line-height: 1.5;">{professional_plan}</pre>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Professional download options
-            st.markdown("---")
-            st.markdown("### 💾 Download Your Professional Report")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.download_button(
-                    label="📄 Download Full Report",
-                    data=professional_plan,
-                    file_name=f"{name.replace(' ', '_')}_Valkyrie_Professional_Report_{datetime.now().strftime('%Y%m%d')}.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-            
-            with col2:
-                # Executive summary
-                summary = f"""
-Valkyrie AI Professional - Executive Summary
-Student: {name}
-Date: {datetime.now().strftime('%B %d, %Y')}
-Risk Level: {'HIGH' if risk_prob > 0.6 else 'MEDIUM' if risk_prob > 0.3 else 'LOW'}
-Risk Score: {risk_prob:.1%}
-
-Priority Actions:
-1. {'Fix sleep schedule immediately' if 'Sleep' in risk_drivers else 'Maintain good sleep habits'}
-2. {'Increase study hours' if 'Grades' in risk_drivers else 'Continue current study pattern'}
-3. {'Reduce social media usage' if 'Focus' in risk_drivers else 'Maintain digital wellness'}
-4. {'Implement stress management' if 'Stress' in risk_drivers else 'Continue wellness practices'}
-
-Next Steps: Follow the 4-week transformation plan for optimal results.
-"""
-                st.download_button(
-                    label="📊 Download Executive Summary",
-                    data=summary,
-                    file_name=f"{name.replace(' ', '_')}_Executive_Summary.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-            
-            with col3:
-                # Action items
-                action_items = "\n".join([f"{i+1}. {driver}" for i, driver in enumerate(risk_drivers)]) if risk_drivers else "1. Maintain current excellence"
-                st.download_button(
-                    label="✅ Download Action Items",
-                    data=f"Priority Actions for {name}:\n\n{action_items}",
-                    file_name=f"{name.replace(' ', '_')}_Action_Items.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-            
-            # Professional footer
-            st.markdown("""
-            <div style="text-align: center; padding: 2rem; background: white; border-radius: 16px; margin-top: 2rem; box-shadow: var(--shadow-sm); border: 1px solid var(--neutral-200);">
-                <h3 style="color: var(--primary-blue); margin: 0 0 1rem 0; font-weight: 600;">🎓 Valkyrie AI Professional Platform</h3>
-                <p style="color: var(--neutral-600); margin: 0; font-size: 1rem; line-height: 1.6;">
-                    Advanced machine learning meets educational psychology for unprecedented student success outcomes.
-                </p>
-                <p style="color: var(--neutral-500); margin: 1rem 0 0 0; font-size: 0.9rem;">
-                    For professional support: support@valkyrie-ai.com | Available 24/7 for student success
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            display_assessment(st.session_state['assessment'])
             
         except Exception as e:
             # Simple error display without HTML formatting issues
@@ -0,0 +1,238 @@
+"""Reproducible per-stage benchmark of the scoring pipeline.
+
+Each stage is timed on its own with fixed synthetic inputs and reports
+p50/p95/p99 latency per call, throughput (items/s) and the peak Python heap
+allocated by one call (``tracemalloc``, so native XGBoost buffers are not
+counted). Results are written as JSON; ``--baseline`` compares a run with an
+earlier one and exits non-zero when any stage's p50 regressed by more than
+the tolerance.
+
+Stages:
+    load_cold / load_warm     RiskEngine.load in a fresh interpreter / again in-process
+    clean_text_short / _long  one sidebar-sized journal / a multi-KB journal
+    clean_texts_10000         bulk normalization of 10k journals
+    nlp_predict               nlp_vectorizer.transform + nlp_model.predict_proba
+    text_scorer               the collapsed linear scorer used by RiskEngine
+    calculate_features        feature engineering for a 100-row batch
+    final_model_N             final_model.predict_proba at N = 1, 100, 10000 rows
+    predict_risk_N            RiskEngine.predict_risk (compiled/native path) at the same sizes
+    generate_plan             counseling report rendering
+
+Usage:
+    python benchmark.py -o bench.json
+    python benchmark.py -o bench-new.json --baseline bench.json --tolerance 0.2
+    python benchmark.py --stages clean_text_short nlp_predict --quick
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine import MODEL_PATH, RAW_COLUMNS, RiskEngine, calculate_features, clean_text
+
+BATCH_SIZES = (1, 100, 10000)
+DEFAULT_TOLERANCE = 0.25
+MIN_SECONDS = 1.0
+MAX_CALLS = 10000
+COLD_LOADS = 3
+
+SHORT_JOURNAL = "I feel overwhelmed with the upcoming exams and assignments! See https://uni.example/help"
+
+
+# ==========================================
+# 1. TIMING
+# ==========================================
+def time_stage(fn, items=1, min_seconds=MIN_SECONDS, max_calls=MAX_CALLS, min_calls=5):
+    """Latency percentiles (ms), throughput and peak heap for repeated calls of ``fn``"""
+    fn()  # first-call costs (lazy imports, caches) are not part of steady-state latency
+    latencies = []
+    deadline = time.perf_counter() + min_seconds
+    while len(latencies) < min_calls or (time.perf_counter() < deadline and len(latencies) < max_calls):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(latencies, items, peak)
+
+
+def summarize(latencies, items=1, peak_bytes=None):
+    ms = np.asarray(latencies) * 1000
+    return {
+        'calls': len(latencies),
+        'items_per_call': items,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+        'throughput_per_s': float(items * len(ms) / (ms.sum() / 1000)),
+        'peak_heap_mb': None if peak_bytes is None else peak_bytes / 2 ** 20,
+    }
+
+
+def cold_load(model_path, runs=COLD_LOADS):
+    """RiskEngine.load in fresh interpreters (imports included), timed inside the child"""
+    script = (
+        "import time; start = time.perf_counter()\n"
+        "from engine import RiskEngine\n"
+        f"RiskEngine.load({model_path!r}, compiled=True)\n"
+        "import resource\n"
+        "print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    latencies, peaks = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], capture_output=True, text=True,
+                             check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        seconds, maxrss_kb = out.stdout.split()[-2:]
+        latencies.append(float(seconds))
+        peaks.append(int(maxrss_kb))
+    result = summarize(latencies)
+    # Whole-process peak RSS here: a fresh interpreter's heap is mostly the model
+    result['peak_heap_mb'] = max(peaks) / 1024
+    return result
+
+
+# ==========================================
+# 2. STAGES
+# ==========================================
+def build_stages(engine, model_path, min_seconds=MIN_SECONDS):
+    """Name -> zero-argument callable producing that stage's result dict"""
+    from batch_score import synthetic_cohort
+    from report_templates import precompile, render_report
+    from text_normalize import clean_texts
+
+    cohort = synthetic_cohort(max(BATCH_SIZES), seed=7)
+    raw = cohort[RAW_COLUMNS]
+    long_journal = " ".join(cohort['journal_entry'].tolist()[:80]) + " https://example.com/x"  # ~3 KB
+    journals = cohort['journal_entry'].tolist()
+    cleaned = [clean_text(SHORT_JOURNAL)]
+    nlp_scores = engine.score_texts(cohort['journal_entry'])
+    features = calculate_features(raw, nlp_scores)
+    drivers = ['Sleep', 'Stress', 'Grades']
+    precompile()
+
+    stages = {
+        'load_cold': lambda: cold_load(model_path),
+        'load_warm': lambda: time_stage(lambda: RiskEngine.load(model_path, compiled=True),
+                                        min_seconds=min_seconds, min_calls=3),
+        'clean_text_short': lambda: time_stage(lambda: clean_text(SHORT_JOURNAL), min_seconds=min_seconds),
+        'clean_text_long': lambda: time_stage(lambda: clean_text(long_journal), min_seconds=min_seconds),
+        'clean_texts_10000': lambda: time_stage(lambda: clean_texts(journals), items=len(journals),
+                                                min_seconds=min_seconds),
+        'text_scorer': lambda: time_stage(lambda: engine.score_cleaned(cleaned), min_seconds=min_seconds),
+        'calculate_features': lambda: time_stage(lambda: calculate_features(raw.iloc[:100], nlp_scores[:100]),
+                                                 items=100, min_seconds=min_seconds),
+        'generate_plan': lambda: time_stage(lambda: render_report(drivers, "Jane Doe", 0.42),
+                                            min_seconds=min_seconds),
+    }
+    if engine.nlp_vectorizer is not None:
+        stages['nlp_predict'] = lambda: time_stage(
+            lambda: engine.nlp_model.predict_proba(engine.nlp_vectorizer.transform(cleaned))[:, 1],
+            min_seconds=min_seconds)
+    for n in BATCH_SIZES:
+        batch = features.iloc[:n]
+        if engine.final_model is not None:
+            stages[f'final_model_{n}'] = (lambda batch=batch, n=n: time_stage(
+                lambda: engine.final_model.predict_proba(batch)[:, 1], items=n, min_seconds=min_seconds))
+        stages[f'predict_risk_{n}'] = (lambda batch=batch, n=n: time_stage(
+            lambda: engine.predict_risk(batch), items=n, min_seconds=min_seconds))
+    return stages
+
+
+def run_suite(model_path=MODEL_PATH, stages=None, min_seconds=MIN_SECONDS):
+    """Benchmark results: environment metadata plus one stats dict per stage"""
+    engine = RiskEngine.load(model_path, compiled=True)
+    available = build_stages(engine, model_path, min_seconds)
+    results = {}
+    for name in stages or available:
+        if name not in available:
+            raise KeyError(f"Unknown stage {name!r}; choose from {sorted(available)}")
+        results[name] = available[name]()
+        print(f"{name:<22} p50 {results[name]['p50_ms']:>10.3f} ms  p99 {results[name]['p99_ms']:>10.3f} ms  "
+              f"{results[name]['throughput_per_s']:>12,.0f}/s", file=sys.stderr)
+
+    import sklearn
+    import xgboost
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'model_path': model_path,
+            'model_version': engine.model_version,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'xgboost': xgboost.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'stages': results,
+    }
+
+
+# ==========================================
+# 3. REGRESSION CHECK
+# ==========================================
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, overrides=None):
+    """Stages whose p50 exceeds the baseline's by more than their tolerance, as (name, old, new, limit)"""
+    overrides = overrides or {}
+    regressions = []
+    for name, stats in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        limit = overrides.get(name, tolerance)
+        if stats['p50_ms'] > before['p50_ms'] * (1 + limit):
+            regressions.append((name, before['p50_ms'], stats['p50_ms'], limit))
+    return regressions
+
+
+def parse_overrides(pairs):
+    """``stage=tolerance`` pairs from the command line"""
+    overrides = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition('=')
+        overrides[name] = float(value)
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the scoring pipeline")
+    parser.add_argument('-o', '--output', help="JSON file to write results to")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    parser.add_argument('--stages', nargs='+', help="Only run these stages")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed fractional p50 slowdown per stage (0.25 = 25%%)")
+    parser.add_argument('--stage-tolerance', nargs='+', metavar='STAGE=TOL', help="Per-stage tolerance overrides")
+    parser.add_argument('--quick', action='store_true', help="Shorter timing loops for smoke runs")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.model, args.stages, min_seconds=0.2 if args.quick else MIN_SECONDS)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, parse_overrides(args.stage_tolerance))
+        for name, before, after, limit in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms (> {limit:.0%} slower)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No stage regressed beyond tolerance ({len(results['stages'])} stages)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
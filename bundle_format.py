@@ -0,0 +1,243 @@
+"""Versioned on-disk model bundle that loads without unpickling.
+
+``export_bundle`` turns ``student_risk_model.pkl`` into a directory::
+
+    manifest.json             format version, model version, checksums
+    ensemble/*.npy            flattened tree and isotonic arrays
+    ensemble/fold_<i>.ubj     each calibration fold's booster (native UBJSON)
+    text/*.npy                TF-IDF vocabulary, idf and logistic coefficients
+
+``load_bundle_dir`` opens the arrays with ``mmap_mode='r'``, so loading is
+near-instant and worker processes share the pages through the OS page cache.
+The compiled evaluator and the collapsed text scorer are rebuilt directly
+from those arrays; the UBJSON boosters are only opened when a batch is large
+enough to be worth XGBoost's threaded predictor.
+
+With ``shared=True`` nothing model-sized is copied into the process: the
+text scorer looks terms up in the mapped, sorted vocabulary arrays instead
+of building a dict, and every batch stays on the mapped tree arrays rather
+than loading private XGBoost boosters. Many workers on one host then hold a
+single copy of the model between them.
+
+Usage:
+    python bundle_format.py export student_risk_model.pkl student_risk_model/
+    python bundle_format.py verify student_risk_model/
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from compiled_model import CompiledEnsemble, IsotonicTable
+from engine import REQUIRED_KEYS, file_checksum, load_bundle
+from nlp_fast import LinearTextScorer, MappedTextScorer
+
+FORMAT_NAME = 'valkyrie-risk-bundle'
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+# What the pickle's required_keys become in this format
+COMPONENT_FILES = {
+    'final_model': [
+        'ensemble/feature.npy', 'ensemble/threshold.npy', 'ensemble/left.npy',
+        'ensemble/default_left.npy', 'ensemble/value.npy', 'ensemble/roots.npy',
+        'ensemble/base_margin.npy', 'ensemble/calibration_x.npy',
+        'ensemble/calibration_y.npy', 'ensemble/calibration_lower.npy',
+        'ensemble/calibration_upper.npy',
+    ],
+    'nlp_model': ['text/coef.npy'],
+    'nlp_vectorizer': ['text/terms.npy', 'text/idf.npy', 'text/sorted_terms.npy', 'text/sorted_weights.npy'],
+}
+
+
+class BundleFormatError(ValueError):
+    """The bundle directory is missing, corrupt or of an unsupported version"""
+
+
+# ==========================================
+# 1. EXPORT
+# ==========================================
+def _compact_index(array):
+    """Smallest unsigned dtype that holds a non-negative index array (feature ids fit in uint8)"""
+    for dtype in (np.uint8, np.uint16):
+        if array.min() >= 0 and array.max() <= np.iinfo(dtype).max:
+            return array.astype(dtype)
+    return array
+
+
+def export_bundle(source, out_dir):
+    """Write the pickled bundle at ``source`` out as a bundle directory"""
+    bundle = load_bundle(source)
+    missing_keys = [key for key in REQUIRED_KEYS if key not in bundle]
+    if missing_keys:
+        raise KeyError(f"Missing model components: {missing_keys}")
+
+    out_dir = Path(out_dir)
+    (out_dir / 'ensemble').mkdir(parents=True, exist_ok=True)
+    (out_dir / 'text').mkdir(parents=True, exist_ok=True)
+
+    final_model = bundle['final_model']
+    ensemble = CompiledEnsemble.from_calibrated(final_model)
+    text_scorer = LinearTextScorer.from_models(bundle['nlp_vectorizer'], bundle['nlp_model'])
+
+    arrays = {
+        'ensemble/feature.npy': _compact_index(ensemble.feature),
+        'ensemble/threshold.npy': ensemble.threshold,
+        'ensemble/left.npy': ensemble.left,
+        'ensemble/default_left.npy': ensemble.default_left,
+        'ensemble/value.npy': ensemble.value,
+        'ensemble/roots.npy': ensemble.roots,
+        'ensemble/base_margin.npy': ensemble.base_margin,
+        'ensemble/calibration_x.npy': ensemble.calibration.x,
+        'ensemble/calibration_y.npy': ensemble.calibration.y,
+        'ensemble/calibration_lower.npy': ensemble.calibration.lower,
+        'ensemble/calibration_upper.npy': ensemble.calibration.upper,
+    }
+    vectorizer, nlp_model = bundle['nlp_vectorizer'], bundle['nlp_model']
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    arrays['text/terms.npy'] = np.asarray(terms, dtype=str)
+    arrays['text/idf.npy'] = np.asarray(vectorizer.idf_, dtype=np.float64)
+    arrays['text/coef.npy'] = np.asarray(nlp_model.coef_[0], dtype=np.float64)
+    arrays['text/sorted_terms.npy'], arrays['text/sorted_weights.npy'] = MappedTextScorer.sorted_arrays(
+        vectorizer.vocabulary_, vectorizer.idf_, nlp_model.coef_[0])
+
+    files = {}
+    for name, array in arrays.items():
+        np.save(out_dir / name, np.ascontiguousarray(array), allow_pickle=False)
+        files[name] = file_checksum(out_dir / name)
+
+    boosters = []
+    for fold, calibrated in enumerate(final_model.calibrated_classifiers_):
+        name = f'ensemble/fold_{fold}.ubj'
+        calibrated.estimator.get_booster().save_model(str(out_dir / name))
+        files[name] = file_checksum(out_dir / name)
+        boosters.append(name)
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'model_version': file_checksum(source)[:12],
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'source': Path(source).name,
+        'required_keys': list(REQUIRED_KEYS),
+        'components': COMPONENT_FILES,
+        'files': files,
+        'ensemble': {
+            'depth': ensemble.depth,
+            'feature_names': ensemble.feature_names,
+            'boosters': boosters,
+        },
+        'text': {
+            'intercept': float(nlp_model.intercept_[0]),
+            'stop_words': sorted(text_scorer.stop_words),
+            'token_pattern': text_scorer.token_pattern.pattern,
+            'ngram_range': list(text_scorer.ngram_range),
+            'lowercase': text_scorer.lowercase,
+        },
+    }
+    with open(out_dir / MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ==========================================
+# 2. LOAD
+# ==========================================
+def read_manifest(bundle_dir, verify=True):
+    """Parse and validate a bundle manifest, optionally checking file checksums"""
+    bundle_dir = Path(bundle_dir)
+    try:
+        with open(bundle_dir / MANIFEST) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise BundleFormatError(f"No {MANIFEST} in {bundle_dir}") from None
+
+    if manifest.get('format') != FORMAT_NAME:
+        raise BundleFormatError(f"{bundle_dir} is not a {FORMAT_NAME} directory")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise BundleFormatError(f"Unsupported bundle format version: {manifest.get('format_version')}")
+
+    components = manifest.get('components', {})
+    missing_keys = [key for key in manifest.get('required_keys', []) if key not in components]
+    if missing_keys:
+        raise BundleFormatError(f"Missing model components: {missing_keys}")
+
+    files = manifest.get('files', {})
+    for key in manifest.get('required_keys', []):
+        for name in components[key]:
+            if name not in files or not (bundle_dir / name).exists():
+                raise BundleFormatError(f"Component {key} is missing {name}")
+
+    if verify:
+        corrupt = [name for name, digest in files.items() if file_checksum(bundle_dir / name) != digest]
+        if corrupt:
+            raise BundleFormatError(f"Checksum mismatch: {corrupt}")
+    return manifest
+
+
+def load_bundle_dir(bundle_dir, mmap=True, verify=True, shared=False):
+    """Rebuild ``(CompiledEnsemble, text scorer, manifest)`` from a bundle directory"""
+    bundle_dir = Path(bundle_dir)
+    manifest = read_manifest(bundle_dir, verify=verify)
+    mmap_mode = 'r' if mmap else None
+
+    def array(name):
+        return np.load(bundle_dir / name, mmap_mode=mmap_mode, allow_pickle=False)
+
+    calibration = IsotonicTable(
+        array('ensemble/calibration_x.npy'), array('ensemble/calibration_y.npy'),
+        2.0 * np.arange(len(array('ensemble/calibration_lower.npy'))),
+        array('ensemble/calibration_lower.npy'), array('ensemble/calibration_upper.npy'),
+    )
+    info = manifest['ensemble']
+    ensemble = CompiledEnsemble(
+        array('ensemble/feature.npy'), array('ensemble/threshold.npy'), array('ensemble/left.npy'),
+        array('ensemble/default_left.npy'), array('ensemble/value.npy'), array('ensemble/roots.npy'),
+        array('ensemble/base_margin.npy'), calibration, info['depth'], info['feature_names'],
+        booster_paths=[str(bundle_dir / name) for name in info['boosters']],
+    )
+    if shared:
+        ensemble.native_min_rows = None
+
+    text = manifest['text']
+    options = dict(stop_words=text['stop_words'], token_pattern=text['token_pattern'],
+                   ngram_range=tuple(text['ngram_range']), lowercase=text['lowercase'])
+    if not shared:
+        terms = array('text/terms.npy')
+        text_scorer = LinearTextScorer({str(term): index for index, term in enumerate(terms)},
+                                       array('text/idf.npy'), array('text/coef.npy'), text['intercept'], **options)
+    else:
+        text_scorer = MappedTextScorer(array('text/sorted_terms.npy'), array('text/sorted_weights.npy'),
+                                       text['intercept'], **options)
+    return ensemble, text_scorer, manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or verify a memory-mappable model bundle")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Convert a pickled bundle into a bundle directory")
+    export.add_argument('source', help="Pickled bundle, e.g. student_risk_model.pkl")
+    export.add_argument('out_dir', help="Directory to write")
+    verify = sub.add_parser('verify', help="Validate a bundle directory's manifest and checksums")
+    verify.add_argument('bundle_dir')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        manifest = export_bundle(args.source, args.out_dir)
+        print(f"Exported model {manifest['model_version']} to {args.out_dir}")
+    else:
+        try:
+            manifest = read_manifest(args.bundle_dir)
+        except BundleFormatError as e:
+            print(f"Invalid bundle: {e}", file=sys.stderr)
+            return 1
+        print(f"OK: model {manifest['model_version']}, format v{manifest['format_version']}, "
+              f"{len(manifest['files'])} files")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Two-stage cascade scoring: a cheap additive model first, the ensemble only near the cut-offs.
+
+Stage one is the ensemble distilled into an additive model over the
+``calculate_features`` columns. Each feature is cut into quantile bins with
+one learned logit contribution per bin, fitted by backfitting to the
+ensemble's own logit on a reference cohort. Scoring a row is a
+``searchsorted`` and a table lookup per feature.
+
+A row exits early when its stage-one risk is more than ``margin`` away from
+every cut-off (``DECISION_THRESHOLD`` and the MEDIUM/HIGH band edges).
+Everything else goes to the full calibrated ensemble. ``margin`` is chosen on
+held-out reference rows as the smallest one for which at most
+``1 - agreement`` of all rows would get a different flag or risk band than
+the full ensemble gives them, less a one-sided 95% allowance for sampling
+noise. The guarantee is therefore empirical: it holds for cohorts that look
+like the reference cohort. Early-exit rows get the stage-one probability as
+``risk_prob``; their flag and band are what the guarantee covers.
+
+Only complete rows can exit early: a row with any missing or non-finite
+feature always goes to the ensemble, so the guarantee covers complete rows
+and incomplete ones match the full model exactly.
+
+The fitted cascade is saved as a plain ``.npz`` file tagged with the model
+version it was distilled from. Loading it against any other model version
+fails.
+
+Usage:
+    python cascade.py fit -o cascade.npz --synthetic 200000 --agreement 0.999
+    python cascade.py report cascade.npz --reference cohort.csv
+    python batch_score.py cohort.csv -o scores.csv --cascade cascade.npz
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine import (DECISION_THRESHOLD, FEATURE_COLUMNS, HIGH_RISK, MEDIUM_RISK, MODEL_PATH, RiskEngine,
+                    calculate_features, prepare_raw)
+
+DEFAULT_AGREEMENT = 0.999
+DEFAULT_BINS = 16
+BACKFIT_SWEEPS = 20
+# Shrinks sparse bins toward zero during backfitting
+RIDGE = 1.0
+# Isotonic calibration returns exact 0s and 1s; keep their logits finite
+LOGIT_CLIP = 1e-4
+CUTS = (DECISION_THRESHOLD, MEDIUM_RISK, HIGH_RISK)
+# Band edges compare with a strict '>' as in engine.risk_level; the decision flag is risk >= DECISION_THRESHOLD
+STRICT_CUTS = (MEDIUM_RISK, HIGH_RISK)
+# One-sided 95% normal quantile: the calibrated error count leaves room for sampling noise
+CONFIDENCE_Z = 1.645
+
+
+def above_cut(risk, cut):
+    """Which rows fall on the upper side of ``cut``, compared the way the engine and app compare against it"""
+    return risk > cut if cut in STRICT_CUTS else risk >= cut
+
+
+def _logit(p):
+    p = np.clip(p, LOGIT_CLIP, 1.0 - LOGIT_CLIP)
+    return np.log(p / (1.0 - p))
+
+
+class CascadeScorer:
+    """Additive lookup-table approximation of the ensemble plus the escalation margin"""
+
+    def __init__(self, edges, tables, intercept, margin, cuts=CUTS, agreement=DEFAULT_AGREEMENT,
+                 model_version=None, feature_names=FEATURE_COLUMNS):
+        self.edges = edges
+        self.tables = tables
+        self.intercept = float(intercept)
+        self.margin = float(margin)
+        self.cuts = tuple(float(cut) for cut in cuts)
+        self.agreement = float(agreement)
+        self.model_version = model_version
+        self.feature_names = list(feature_names)
+
+    @classmethod
+    def fit(cls, features, risk, bins=DEFAULT_BINS, agreement=DEFAULT_AGREEMENT, cuts=CUTS,
+            calibration_fraction=0.5, model_version=None, seed=0):
+        """Distill ``risk`` (the ensemble's output on ``features``) and calibrate the margin on held-out rows"""
+        # Incomplete rows always escalate, so the tables are fitted on complete rows only
+        complete = np.isfinite(features[FEATURE_COLUMNS].to_numpy(dtype=np.float64)).all(axis=1)
+        features = features[complete]
+        X = features[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        risk = np.asarray(risk, dtype=np.float64)[complete]
+        order = np.random.default_rng(seed).permutation(len(X))
+        n_fit = int(len(X) * (1.0 - calibration_fraction))
+        fit_rows, calibration_rows = order[:n_fit], order[n_fit:]
+        if n_fit == 0 or len(calibration_rows) == 0:
+            raise ValueError("Need rows for both fitting and margin calibration")
+
+        edges = []
+        for column in X[fit_rows].T:
+            values = np.unique(column)
+            if len(values) <= bins:
+                edges.append(values[1:])
+            else:
+                edges.append(np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1])))
+        index = [np.searchsorted(e, X[fit_rows, j], side='right') for j, e in enumerate(edges)]
+
+        target = _logit(risk[fit_rows])
+        intercept = target.mean()
+        residual = target - intercept
+        tables = [np.zeros(len(e) + 1) for e in edges]
+        for _ in range(BACKFIT_SWEEPS):
+            for j, idx in enumerate(index):
+                residual += tables[j][idx]
+                sums = np.bincount(idx, residual, minlength=len(tables[j]))
+                tables[j] = sums / (np.bincount(idx, minlength=len(tables[j])) + RIDGE)
+                residual -= tables[j][idx]
+
+        scorer = cls(edges, tables, intercept, 0.0, cuts, agreement, model_version)
+        scorer.margin = scorer.calibrate_margin(features.iloc[calibration_rows], risk[calibration_rows], agreement)
+        return scorer
+
+    def calibrate_margin(self, features, risk, agreement):
+        """Smallest margin with at most ``1 - agreement`` of rows exiting early on the wrong side of a cut"""
+        approx = self.approx_risk(features)
+        wrong = np.zeros(len(approx), dtype=bool)
+        for cut in self.cuts:
+            wrong |= above_cut(approx, cut) != above_cut(risk, cut)
+        # Incomplete rows never exit early, so they can never exit on the wrong side
+        wrong &= self._complete(features)
+        # A wrong row exits early (and stays wrong) only while the margin is below its distance to every cut
+        exit_below = np.sort(self._cut_distance(approx[wrong]))[::-1]
+        expected = (1.0 - agreement) * len(approx)
+        allowed = max(int(expected - CONFIDENCE_Z * np.sqrt(expected)), 0)
+        return float(exit_below[allowed]) if allowed < len(exit_below) else 0.0
+
+    def _complete(self, features):
+        return np.isfinite(features[self.feature_names].to_numpy(dtype=np.float64)).all(axis=1)
+
+    def _cut_distance(self, approx):
+        return np.min(np.abs(approx[:, None] - np.asarray(self.cuts)[None, :]), axis=1)
+
+    def approx_risk(self, features):
+        """Stage-one risk probabilities"""
+        X = features[self.feature_names].to_numpy(dtype=np.float64)
+        logit = np.full(len(X), self.intercept)
+        for j, (edges, table) in enumerate(zip(self.edges, self.tables)):
+            logit += table[np.searchsorted(edges, X[:, j], side='right')]
+        return 1.0 / (1.0 + np.exp(-logit))
+
+    def predict(self, features, full_predict):
+        """``(risk, escalated)``: stage-one risk where it is clear-cut, ``full_predict`` on the rest"""
+        risk = self.approx_risk(features)
+        # A missing feature lands in an arbitrary bin, so its stage-one risk says nothing
+        escalated = (self._cut_distance(risk) <= self.margin) | ~self._complete(features)
+        if escalated.any():
+            risk[escalated] = full_predict(features.iloc[np.flatnonzero(escalated)])
+        return risk, escalated
+
+    def save(self, path):
+        arrays = {f'edges_{j}': e for j, e in enumerate(self.edges)}
+        arrays.update({f'table_{j}': t for j, t in enumerate(self.tables)})
+        np.savez(path, intercept=self.intercept, margin=self.margin, cuts=np.asarray(self.cuts),
+                 agreement=self.agreement, model_version=np.asarray(str(self.model_version)),
+                 feature_names=np.asarray(self.feature_names), **arrays)
+
+    @classmethod
+    def load(cls, path, model_version=None):
+        """Load a saved cascade; raises if it was distilled from a different ``model_version``"""
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data['feature_names']]
+            saved_version = str(data['model_version'])
+            if model_version is not None and saved_version != str(model_version):
+                raise ValueError(f"Cascade {path} was fitted for model {saved_version}, not {model_version}")
+            return cls([data[f'edges_{j}'] for j in range(len(names))],
+                       [data[f'table_{j}'] for j in range(len(names))],
+                       float(data['intercept']), float(data['margin']), data['cuts'].tolist(),
+                       float(data['agreement']), saved_version, names)
+
+
+def reference_features(engine, cohort, text_column='journal_entry'):
+    """Engineered features of a reference cohort (journals scored once)"""
+    texts = cohort[text_column].tolist() if text_column in cohort else [""] * len(cohort)
+    return calculate_features(prepare_raw(cohort), engine.score_texts(texts))
+
+
+def report(engine, cascade, cohort, text_column='journal_entry'):
+    """Escalated fraction, observed agreement and speedups of the cascade against the full ensemble"""
+    start = time.perf_counter()
+    full = engine.score_many(cohort, text_column=text_column)
+    full_seconds = time.perf_counter() - start
+    engine.cascade = cascade
+    try:
+        start = time.perf_counter()
+        fast = engine.score_many(cohort, text_column=text_column)
+        cascade_seconds = time.perf_counter() - start
+    finally:
+        engine.cascade = None
+
+    features = reference_features(engine, cohort, text_column)
+    start = time.perf_counter()
+    engine.predict_risk(features)
+    ensemble_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cascade.predict(features, engine.predict_risk)
+    stage_seconds = time.perf_counter() - start
+
+    agree = np.ones(len(full), dtype=bool)
+    for cut in cascade.cuts:
+        agree &= above_cut(full['risk_prob'].to_numpy(), cut) == above_cut(fast['risk_prob'].to_numpy(), cut)
+    return {
+        'rows': len(cohort),
+        'margin': cascade.margin,
+        'target_agreement': cascade.agreement,
+        'escalated_fraction': float(fast['escalated'].mean()),
+        'agreement': float(agree.mean()),
+        'ensemble_speedup': ensemble_seconds / stage_seconds,
+        'end_to_end_speedup': full_seconds / cascade_seconds,
+        'full_seconds': full_seconds,
+        'cascade_seconds': cascade_seconds,
+    }
+
+
+def main(argv=None):
+    from batch_score import read_table, synthetic_cohort
+
+    parser = argparse.ArgumentParser(description="Fit or evaluate the two-stage cascade scorer")
+    sub = parser.add_subparsers(dest='command', required=True)
+    fit = sub.add_parser('fit', help="Distill the ensemble on a reference cohort")
+    fit.add_argument('-o', '--output', required=True, help="Where to save the cascade (.npz)")
+    fit.add_argument('--agreement', type=float, default=DEFAULT_AGREEMENT,
+                     help="Minimum share of rows whose flag and band must match the full ensemble")
+    fit.add_argument('--bins', type=int, default=DEFAULT_BINS, help="Quantile bins per feature")
+    evaluate = sub.add_parser('report', help="Escalation, agreement and speedup on a reference cohort")
+    evaluate.add_argument('cascade', help="Saved cascade (.npz)")
+    for command in (fit, evaluate):
+        command.add_argument('--reference', help="CSV/Parquet reference cohort")
+        command.add_argument('--synthetic', type=int, metavar='N', help="Use N synthetic students instead")
+        command.add_argument('--text-column', default='journal_entry')
+        command.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    args = parser.parse_args(argv)
+    if not args.reference and not args.synthetic:
+        parser.error("--reference or --synthetic N is required")
+
+    engine = RiskEngine.load(args.model, compiled=True)
+    # Report on different synthetic students than the cascade was fitted on
+    cohort = read_table(args.reference) if args.reference else synthetic_cohort(
+        args.synthetic, seed=0 if args.command == 'fit' else 1)
+
+    if args.command == 'fit':
+        features = reference_features(engine, cohort, args.text_column)
+        cascade = CascadeScorer.fit(features, engine.predict_risk(features), bins=args.bins,
+                                    agreement=args.agreement, model_version=engine.model_version)
+        cascade.save(args.output)
+        print(f"Fitted cascade for model {engine.model_version} on {len(cohort):,} rows: "
+              f"margin {cascade.margin:.4f} for {cascade.agreement:.2%} agreement")
+        return 0
+
+    result = report(engine, CascadeScorer.load(args.cascade, engine.model_version), cohort, args.text_column)
+    print(f"{result['rows']:,} rows: {result['escalated_fraction']:.1%} escalated (margin {result['margin']:.4f}), "
+          f"agreement {result['agreement']:.4%} (target {result['target_agreement']:.2%})")
+    print(f"ensemble stage {result['ensemble_speedup']:.1f}x faster; end to end {result['full_seconds']:.2f}s -> "
+          f"{result['cascade_seconds']:.2f}s ({result['end_to_end_speedup']:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
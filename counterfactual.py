@@ -0,0 +1,103 @@
+"""Vectorized what-if analysis and minimal-change counterfactuals.
+
+For one student, ``scenario_grid`` builds every combination of moves over
+the actionable inputs (sleep, study, social media, attendance, library
+hours) as one matrix, ``calculate_features`` recomputes the derived columns
+(``sleep_deviation``, ``focus_ratio``, ``risk_alarm``, ...) for the whole grid
+at once, and the ensemble scores it in a single batched call.
+``minimal_change`` then returns the cheapest scenario whose risk falls below
+the decision threshold.
+"""
+import numpy as np
+import pandas as pd
+
+from engine import DECISION_THRESHOLD, RAW_COLUMNS, calculate_features
+
+# column -> (candidate deltas, lower bound, upper bound, units of one "step" of effort)
+ACTIONABLE = {
+    'sleep_hours_avg': (np.arange(-3.0, 3.01, 1.0), 0.0, 12.0, 1.0),
+    'avg_daily_study_hours': (np.arange(-2.0, 4.01, 1.0), 0.0, 12.0, 1.0),
+    'social_media_hours_per_day': (np.arange(-4.0, 0.01, 0.5), 0.0, 8.0, 1.0),
+    'attendance_pct': (np.arange(0.0, 30.01, 5.0), 0.0, 100.0, 10.0),
+    'avg_weekly_library_hours': (np.arange(0.0, 8.01, 2.0), 0.0, 20.0, 4.0),
+}
+
+LABELS = {
+    'sleep_hours_avg': 'Sleep Hours',
+    'avg_daily_study_hours': 'Daily Study Hours',
+    'social_media_hours_per_day': 'Social Media Hours',
+    'attendance_pct': 'Attendance %',
+    'avg_weekly_library_hours': 'Library Hours/Week',
+}
+
+
+def scenario_grid(raw, actionable=ACTIONABLE):
+    """Every in-bounds combination of actionable moves for one student, plus its effort cost.
+
+    Returns ``(grid, cost)`` where ``grid`` has the student's RAW_COLUMNS with
+    one row per distinct scenario (row 0 is the unchanged profile) and
+    ``cost`` is the summed absolute change in effort units.
+    """
+    columns = list(actionable)
+    values = []
+    for col in columns:
+        deltas, lower, upper, _ = actionable[col]
+        # Always include the current value so the unchanged profile is in the grid
+        values.append(np.unique(np.append(np.clip(raw[col] + deltas, lower, upper), raw[col])))
+
+    combos = np.stack([axis.ravel() for axis in np.meshgrid(*values, indexing='ij')], axis=1)
+    current = np.array([raw[col] for col in columns], dtype=np.float64)
+    scale = np.array([actionable[col][3] for col in columns])
+    cost = (np.abs(combos - current) / scale).sum(axis=1)
+
+    # Put the unchanged profile first so row 0 is the baseline
+    order = np.argsort(cost, kind='stable')
+    combos, cost = combos[order], cost[order]
+
+    grid = pd.DataFrame({col: np.full(len(combos), raw[col]) for col in RAW_COLUMNS if col not in columns})
+    for i, col in enumerate(columns):
+        grid[col] = combos[:, i]
+    return grid[RAW_COLUMNS], cost
+
+
+def what_if(engine, raw, nlp_score, actionable=ACTIONABLE):
+    """Score the whole scenario grid in one call; returns the grid with ``risk_prob`` and ``cost``"""
+    grid, cost = scenario_grid(raw, actionable)
+    features = calculate_features(grid, nlp_score)
+    grid['risk_prob'] = engine.predict_risk(features)
+    grid['cost'] = cost
+    return grid
+
+
+def minimal_change(engine, raw, nlp_score, threshold=DECISION_THRESHOLD, actionable=ACTIONABLE):
+    """Smallest change that brings risk below ``threshold``.
+
+    Returns a dict with the baseline and new risk, the effort cost, whether
+    the threshold was reached, and ``changes`` as ``{column: (from, to)}``.
+    If no scenario gets below the threshold, the lowest-risk scenario is
+    returned with ``reaches_threshold=False``.
+    """
+    grid = what_if(engine, raw, nlp_score, actionable)
+    baseline = float(grid['risk_prob'].iloc[0])
+    below = grid['risk_prob'].to_numpy() < threshold
+
+    if below.any():
+        candidates = grid[below]
+        # Cheapest first; among equally cheap scenarios prefer the lowest risk
+        best = candidates.iloc[np.lexsort((candidates['risk_prob'].to_numpy(), candidates['cost'].to_numpy()))[0]]
+    else:
+        best = grid.iloc[int(np.argmin(grid['risk_prob'].to_numpy()))]
+
+    changes = {
+        col: (raw[col], float(best[col]))
+        for col in actionable
+        if not np.isclose(best[col], raw[col])
+    }
+    return {
+        'baseline_risk': baseline,
+        'risk_prob': float(best['risk_prob']),
+        'cost': float(best['cost']),
+        'reaches_threshold': bool(below.any()),
+        'changes': changes,
+        'scenarios': len(grid),
+    }
@@ -0,0 +1,312 @@
+"""Bounded-memory input and prediction drift monitoring.
+
+A reference profile fixes, for every ``calculate_features`` column and for
+``risk_prob``, a set of bin edges (reference quantiles, or the distinct
+values of discrete columns such as ``is_backlog``) and the reference share
+of rows in each bin. ``DriftMonitor`` keeps one integer counter per bin and
+adds every scored row to it, so memory is fixed by the profile, not by
+traffic, and an update is a ``searchsorted`` per column. ``snapshot()``
+compares the live histograms with the reference at any time:
+
+    psi   population stability index, sum((live - ref) * ln(live / ref))
+    ks    largest gap between the live and reference CDFs at the bin edges
+
+Conventional PSI reading: below 0.1 stable, 0.1-0.25 moderate shift, above
+0.25 significant shift.
+
+Counters from several processes can be merged, and ``state_path`` persists
+them so a monitor survives restarts and the CLI can report on a running app.
+The file is rewritten atomically on a background thread once ``save_every``
+rows have been added, and a last time at exit, so scoring never waits on it.
+
+Usage:
+    python drift_monitor.py profile --reference training_cohort.csv -o drift_profile.json
+    python drift_monitor.py snapshot --state drift_state.json
+    python drift_monitor.py check cohort.csv --profile drift_profile.json
+"""
+import argparse
+import atexit
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from engine import FEATURE_COLUMNS, MODEL_PATH, RiskEngine
+
+DRIFT_PROFILE = 'drift_profile.json'
+DRIFT_STATE = 'drift_state.json'
+DEFAULT_BINS = 20
+DEFAULT_SAVE_EVERY = 100
+MONITORED_COLUMNS = FEATURE_COLUMNS + ['risk_prob']
+
+# Keeps empty bins from sending ln(live / ref) to infinity
+PSI_EPSILON = 1e-4
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+logger = logging.getLogger(__name__)
+
+
+def _edges(values, bins):
+    """Interior bin edges: midpoints between distinct values for discrete columns, quantiles otherwise"""
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= bins:
+        return (distinct[1:] + distinct[:-1]) / 2.0
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+
+
+def build_profile(features, risk, bins=DEFAULT_BINS, model_version=None):
+    """Reference profile (JSON-ready dict) from engineered features and risk of a reference cohort"""
+    frame = features[FEATURE_COLUMNS].assign(risk_prob=np.asarray(risk, dtype=np.float64))
+    columns = {}
+    for column in MONITORED_COLUMNS:
+        values = frame[column].to_numpy(dtype=np.float64)
+        edges = _edges(values, bins)
+        counts = np.bincount(np.searchsorted(edges, values[~np.isnan(values)], side='right'),
+                             minlength=len(edges) + 1)
+        columns[column] = {'edges': edges.tolist(), 'proportions': (counts / max(counts.sum(), 1)).tolist()}
+    return {
+        'rows': len(frame),
+        'model_version': model_version,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'columns': columns,
+    }
+
+
+def _write_json(data, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def load_profile(path=DRIFT_PROFILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def monitor_from_files(profile_path=DRIFT_PROFILE, state_path=DRIFT_STATE):
+    """A monitor persisting to ``state_path``, or None until a profile has been exported"""
+    if not os.path.exists(profile_path):
+        return None
+    return DriftMonitor(load_profile(profile_path), state_path=state_path)
+
+
+class DriftMonitor:
+    """Fixed-size live histograms per monitored column, compared against a reference profile"""
+
+    def __init__(self, profile, state_path=None, save_every=DEFAULT_SAVE_EVERY):
+        self.profile = profile
+        # risk_prob last: update() appends it after the feature columns
+        self.columns = [column for column in FEATURE_COLUMNS if column in profile['columns']] + ['risk_prob']
+        self._feature_columns = self.columns[:-1]
+        self._edges = {c: np.asarray(profile['columns'][c]['edges'], dtype=np.float64) for c in self.columns}
+        self._reference = {c: np.asarray(profile['columns'][c]['proportions'], dtype=np.float64)
+                           for c in self.columns}
+        self._edge_lists = {c: edges.tolist() for c, edges in self._edges.items()}
+        self.state_path = state_path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.reset()
+        if state_path and os.path.exists(state_path):
+            self.load_state(state_path)
+        # update() only signals this; the writer thread does the file I/O off the scoring path
+        self._save_requested = threading.Event()
+        if state_path:
+            threading.Thread(target=self._write_loop, daemon=True, name='drift-state').start()
+            atexit.register(self.flush)
+
+    def reset(self):
+        with self._lock:
+            self.rows = 0
+            self._counts = {c: np.zeros(len(self._edges[c]) + 1, dtype=np.int64) for c in self.columns}
+            self._missing = dict.fromkeys(self.columns, 0)
+            self._unsaved = 0
+
+    def update(self, features, risk):
+        """Add scored rows: engineered ``features`` (a DataFrame) and their risk probabilities"""
+        risk = np.atleast_1d(np.asarray(risk, dtype=np.float64))
+        if list(features.columns) != self._feature_columns:
+            # Column selection costs more than the whole update; calculate_features output skips it
+            features = features[self._feature_columns]
+        values = np.column_stack([features.to_numpy(dtype=np.float64), risk])
+        with self._lock:
+            if len(values) == 1:
+                # One assessment: a bisect per column beats array calls on a single value
+                for column, value in zip(self.columns, values[0].tolist()):
+                    if value != value:
+                        self._missing[column] += 1
+                    else:
+                        self._counts[column][bisect.bisect_right(self._edge_lists[column], value)] += 1
+            else:
+                for column, column_values in zip(self.columns, values.T):
+                    present = ~np.isnan(column_values)
+                    index = np.searchsorted(self._edges[column], column_values[present], side='right')
+                    self._counts[column] += np.bincount(index, minlength=len(self._counts[column]))
+                    self._missing[column] += int(len(column_values) - present.sum())
+            self.rows += len(values)
+            self._unsaved += len(values)
+            save = self.state_path is not None and self._unsaved >= self.save_every
+        if save:
+            self._save_requested.set()
+
+    def state(self):
+        """The live counters as a JSON-ready dict (a few KB regardless of rows seen)"""
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'counts': {c: self._counts[c].tolist() for c in self.columns},
+                'missing': dict(self._missing),
+            }
+
+    def merge(self, state):
+        """Add counters from ``state()`` of a monitor on the same profile, e.g. a batch worker's"""
+        with self._lock:
+            for column in self.columns:
+                self._counts[column] += np.asarray(state['counts'][column], dtype=np.int64)
+                self._missing[column] += state['missing'][column]
+            self.rows += state['rows']
+
+    def snapshot(self):
+        """Per-column PSI, KS and status against the reference, plus the live row count"""
+        with self._lock:
+            counts = {c: self._counts[c].copy() for c in self.columns}
+            missing = dict(self._missing)
+            rows = self.rows
+        columns = {}
+        for column in self.columns:
+            total = counts[column].sum()
+            if total == 0:
+                columns[column] = {'psi': None, 'ks': None, 'status': 'no data', 'missing': missing[column]}
+                continue
+            live = counts[column] / total
+            reference = self._reference[column]
+            live_safe = np.maximum(live, PSI_EPSILON)
+            reference_safe = np.maximum(reference, PSI_EPSILON)
+            psi = float(np.sum((live_safe - reference_safe) * np.log(live_safe / reference_safe)))
+            ks = float(np.max(np.abs(np.cumsum(live) - np.cumsum(reference))))
+            status = 'significant' if psi > PSI_SIGNIFICANT else 'moderate' if psi > PSI_MODERATE else 'stable'
+            columns[column] = {'psi': psi, 'ks': ks, 'status': status, 'missing': missing[column]}
+        return {
+            'rows': rows,
+            'reference_rows': self.profile.get('rows'),
+            'model_version': self.profile.get('model_version'),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'columns': columns,
+        }
+
+    def save_state(self, path=None):
+        """Atomically write ``state()`` to ``path`` (default: ``state_path``)"""
+        # The writer thread and flush() share one temporary file
+        with self._save_lock:
+            state = self.state()
+            with self._lock:
+                self._unsaved = 0
+            _write_json(state, path or self.state_path)
+
+    def flush(self):
+        """Write ``state_path`` now if rows were added since the last save"""
+        with self._lock:
+            unsaved = self._unsaved
+        if unsaved and self.state_path:
+            self.save_state()
+
+    def _write_loop(self):
+        while True:
+            self._save_requested.wait()
+            self._save_requested.clear()
+            try:
+                self.save_state()
+            except OSError:
+                # Counters stay in memory; the next request or the exit flush retries
+                logger.exception("Could not save drift state to %s", self.state_path)
+
+    def load_state(self, path):
+        """Restore counters saved against this profile; state from another profile is discarded"""
+        with open(path) as f:
+            state = json.load(f)
+        counts = state.get('counts', {})
+        # Counters saved against a different profile (other columns or bin edges) cannot be reused
+        if any(len(counts.get(column, ())) != len(self._counts[column]) for column in self.columns):
+            logger.warning("Discarding drift state in %s: it was saved against a different profile", path)
+            self.reset()
+            return
+        with self._lock:
+            for column in self.columns:
+                self._counts[column] = np.asarray(counts[column], dtype=np.int64)
+                self._missing[column] = state['missing'].get(column, 0)
+            self.rows = state['rows']
+
+
+def print_snapshot(snapshot):
+    print(f"{snapshot['rows']:,} live rows vs {snapshot['reference_rows']:,} reference rows "
+          f"(profile for model {snapshot['model_version']})")
+    print(f"{'column':<36} {'psi':>8} {'ks':>7}  status")
+    for column, stats in snapshot['columns'].items():
+        if stats['psi'] is None:
+            print(f"{column:<36} {'-':>8} {'-':>7}  {stats['status']}")
+        else:
+            print(f"{column:<36} {stats['psi']:>8.4f} {stats['ks']:>7.4f}  {stats['status']}")
+
+
+def main(argv=None):
+    from batch_score import read_table, synthetic_cohort
+
+    parser = argparse.ArgumentParser(description="Build drift profiles and report feature/prediction drift")
+    sub = parser.add_subparsers(dest='command', required=True)
+    profile = sub.add_parser('profile', help="Export a reference profile from a reference cohort")
+    profile.add_argument('--reference', help="CSV/Parquet reference cohort (e.g. the training data)")
+    profile.add_argument('--synthetic', type=int, metavar='N', help="Use N synthetic students instead")
+    profile.add_argument('--bins', type=int, default=DEFAULT_BINS)
+    profile.add_argument('-o', '--output', default=DRIFT_PROFILE)
+    snapshot = sub.add_parser('snapshot', help="Report drift from saved live counters")
+    snapshot.add_argument('--state', default=DRIFT_STATE)
+    check = sub.add_parser('check', help="Score a cohort file and report its drift")
+    check.add_argument('input', help="CSV/Parquet cohort export")
+    for command in (profile, check):
+        command.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+        command.add_argument('--text-column', default='journal_entry')
+    for command in (snapshot, check):
+        command.add_argument('--profile', default=DRIFT_PROFILE)
+        command.add_argument('--json', action='store_true', help="Print the snapshot as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == 'snapshot':
+        monitor = DriftMonitor(load_profile(args.profile), state_path=args.state)
+        result = monitor.snapshot()
+    else:
+        engine = RiskEngine.load(args.model, compiled=True)
+        if args.command == 'profile':
+            if not args.reference and not args.synthetic:
+                parser.error("--reference or --synthetic N is required")
+            cohort = read_table(args.reference) if args.reference else synthetic_cohort(args.synthetic)
+        else:
+            cohort = read_table(args.input)
+        from cascade import reference_features
+
+        features = reference_features(engine, cohort, args.text_column)
+        risk = engine.predict_risk(features)
+        if args.command == 'profile':
+            _write_json(build_profile(features, risk, args.bins, engine.model_version), args.output)
+            print(f"Wrote drift profile for {len(cohort):,} rows to {args.output}")
+            return 0
+        monitor = DriftMonitor(load_profile(args.profile))
+        monitor.update(features, risk)
+        result = monitor.snapshot()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_snapshot(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Headless scoring engine shared by the Streamlit app and batch jobs.
+
+Nothing in this module touches Streamlit, so command line tools and worker
+processes can import it and score without paying for the UI. Typical use::
+
+    engine = RiskEngine.load('student_risk_model.pkl')
+    result = engine.score_one(raw_inputs, journal_text)
+    scores = engine.score_many(cohort_df)
+"""
+import hashlib
+import os
+import re
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from instrumentation import METRICS
+from text_normalize import MAX_TEXT_CHARS, clean_one, clean_texts
+
+MODEL_PATH = 'student_risk_model.pkl'
+# Output directory of `python bundle_format.py export`
+BUNDLE_DIR = 'student_risk_model'
+REQUIRED_KEYS = ['final_model', 'nlp_model', 'nlp_vectorizer']
+
+# Raw inputs collected by the sidebar form (and expected in batch exports)
+RAW_COLUMNS = [
+    'previous_sem_gpa', 'attendance_pct', 'avg_daily_study_hours',
+    'social_media_hours_per_day', 'sleep_hours_avg', 'last_test_score',
+    'is_backlog', 'avg_weekly_library_hours', 'extracurricular_engagement_score'
+]
+
+# Column order the calibrated ensemble was fitted on
+FEATURE_COLUMNS = [
+    'attendance_pct', 'sleep_hours_avg', 'avg_daily_study_hours',
+    'avg_weekly_library_hours', 'previous_sem_gpa', 'last_test_score',
+    'social_media_hours_per_day', 'extracurricular_engagement_score',
+    'is_exam_week', 'nlp_stress_score', 'is_backlog', 'sleep_deviation',
+    'academic_index', 'focus_ratio', 'risk_alarm'
+]
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Probability cut-off tuned for 85% recall on the validation set
+DECISION_THRESHOLD = 0.2778
+
+# Report bands: risk above HIGH_RISK is HIGH, above MEDIUM_RISK is MEDIUM, otherwise LOW
+HIGH_RISK = 0.6
+MEDIUM_RISK = 0.3
+
+
+# ==========================================
+# 1. MODEL LOADING
+# ==========================================
+def file_checksum(path):
+    """SHA-256 hex digest of a file, used to tag scores with a model version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_bundle(path=MODEL_PATH):
+    """Load the pickled model bundle (a dict of fitted components)"""
+    return joblib.load(path)
+
+
+def shared_model_from_env(environ=os.environ):
+    """Whether VALKYRIE_SHARED_MODEL asks bundle directories to load in shared mode"""
+    return environ.get('VALKYRIE_SHARED_MODEL', '').lower() in ('1', 'true', 'yes')
+
+
+# ==========================================
+# 2. CORE PROCESSING FUNCTIONS
+# ==========================================
+def clean_text(text):
+    """Clean and process text input"""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def calculate_features(input_df, nlp_score):
+    """Calculate engineered features for the model"""
+    df = input_df.copy()
+    df['nlp_stress_score'] = nlp_score
+
+    # The form has no exam-week input; the model treats 0 as a regular week
+    if 'is_exam_week' not in df:
+        df['is_exam_week'] = 0
+
+    # Academic Index
+    df['academic_index'] = ((df['previous_sem_gpa'] * 10) + df['last_test_score']) / 2
+
+    # Sleep Deviation
+    df['sleep_deviation'] = abs(df['sleep_hours_avg'] - 8)
+
+    # Focus Ratio
+    df['focus_ratio'] = df['avg_daily_study_hours'] / (df['social_media_hours_per_day'] + 1)
+
+    # Risk Alarm
+    df['risk_alarm'] = np.where((df['is_backlog'] == 1) & (df['attendance_pct'] < 75), 1, 0)
+
+    return df[FEATURE_COLUMNS]
+
+
+def prepare_raw(raw_df):
+    """RAW_COLUMNS (and ``is_exam_week`` if present) of a cohort export, with Yes/No backlogs mapped to 1/0"""
+    missing = [col for col in RAW_COLUMNS if col not in raw_df]
+    if missing:
+        raise KeyError(f"Missing input columns: {missing}")
+
+    raw = raw_df[RAW_COLUMNS + [c for c in ['is_exam_week'] if c in raw_df]].reset_index(drop=True)
+    # object under pandas 2, str under pandas 3
+    if not pd.api.types.is_numeric_dtype(raw['is_backlog']):
+        raw['is_backlog'] = raw['is_backlog'].map({'Yes': 1, 'No': 0}).fillna(raw['is_backlog'])
+        raw['is_backlog'] = raw['is_backlog'].astype(int)
+    return raw
+
+
+def risk_level(risk_prob):
+    """Map a risk probability onto the HIGH/MEDIUM/LOW bands used in reports"""
+    return 'HIGH' if risk_prob > HIGH_RISK else 'MEDIUM' if risk_prob > MEDIUM_RISK else 'LOW'
+
+
+# ==========================================
+# 3. SCORING ENGINE
+# ==========================================
+class RiskEngine:
+    """A loaded model bundle plus the full journal-to-risk scoring pipeline"""
+
+    # Journals are cut to this many characters before cleaning (None disables the guard)
+    max_text_chars = MAX_TEXT_CHARS
+
+    def __init__(self, bundle, compiled=False, model_version=None, cache=None):
+        missing_keys = [key for key in REQUIRED_KEYS if key not in bundle]
+        if missing_keys:
+            raise KeyError(f"Missing model components: {missing_keys}")
+        self.bundle = bundle
+        self.final_model = bundle['final_model']
+        self.nlp_model = bundle['nlp_model']
+        self.nlp_vectorizer = bundle['nlp_vectorizer']
+        self.text_scorer = self._collapse_text_model()
+        self.compiled_model = self._compile() if compiled else None
+        self.model_version = model_version
+        # True when all model state lives in a shared memory-mapped bundle
+        self.shared = False
+        # Optional score_cache.ScoreCache consulted by score_one
+        self.cache = cache
+        # Optional cascade.CascadeScorer used by score_many
+        self.cascade = None
+        # Optional drift_monitor.DriftMonitor fed every scored row
+        self.drift = None
+
+    @classmethod
+    def load(cls, path=MODEL_PATH, compiled=False, cache=None):
+        """Build an engine from a pickled bundle or an exported bundle directory"""
+        if os.path.isdir(path):
+            return cls.from_bundle_dir(path, cache=cache)
+        with METRICS.stage('model_load'):
+            return cls(load_bundle(path), compiled=compiled,
+                       model_version=file_checksum(path)[:12], cache=cache)
+
+    @classmethod
+    def from_bundle_dir(cls, path, mmap=True, verify=True, cache=None, shared=None):
+        """Build an engine from ``bundle_format`` arrays without unpickling sklearn objects.
+
+        ``shared`` keeps all model state in the mapped files so many workers share one
+        copy (default: the VALKYRIE_SHARED_MODEL environment variable).
+        """
+        from bundle_format import load_bundle_dir
+
+        if shared is None:
+            shared = shared_model_from_env()
+        with METRICS.stage('model_load'):
+            compiled_model, text_scorer, manifest = load_bundle_dir(path, mmap=mmap, verify=verify, shared=shared)
+        engine = cls.__new__(cls)
+        engine.bundle = None
+        engine.final_model = engine.nlp_model = engine.nlp_vectorizer = None
+        engine.text_scorer = text_scorer
+        engine.compiled_model = compiled_model
+        engine.model_version = manifest['model_version']
+        engine.shared = shared
+        engine.cache = cache
+        engine.cascade = None
+        engine.drift = None
+        return engine
+
+    def _collapse_text_model(self):
+        """Per-token weight table for the stress model, or None if it can't be collapsed"""
+        from nlp_fast import LinearTextScorer
+
+        try:
+            return LinearTextScorer.from_models(self.nlp_vectorizer, self.nlp_model)
+        except ValueError:
+            return None
+
+    def _compile(self):
+        """Compile the ensemble and check it against the reference on probe rows"""
+        from compiled_model import TOLERANCE, CompiledEnsemble
+
+        compiled_model = CompiledEnsemble.from_calibrated(self.final_model)
+        probe = pd.DataFrame(
+            np.random.default_rng(0).uniform(0, 100, (64, len(FEATURE_COLUMNS))),
+            columns=FEATURE_COLUMNS,
+        )
+        error = compiled_model.max_error(self.final_model, probe)
+        if error > TOLERANCE:
+            raise ValueError(f"Compiled ensemble deviates from final_model by {error:.2e}")
+        return compiled_model
+
+    @property
+    def explainer(self):
+        """``attribution.DriverExplainer`` over this engine's boosters, built once on first use"""
+        if getattr(self, '_explainer', None) is None:
+            from attribution import DriverExplainer
+
+            self._explainer = DriverExplainer.from_engine(self)
+        return self._explainer
+
+    def score_texts(self, texts):
+        """Stress probabilities for many journal entries in one vectorizer call"""
+        with METRICS.stage('clean_text', len(texts)):
+            cleaned = clean_texts(texts, self.max_text_chars)
+        return self.score_cleaned(cleaned)
+
+    def score_cleaned(self, cleaned):
+        """Stress probabilities for journal entries that already went through ``clean_text``"""
+        if self.text_scorer is not None:
+            # The collapsed scorer tokenizes and weights in one pass, so there is no separate vectorize stage
+            with METRICS.stage('nlp_predict', len(cleaned)):
+                return self.text_scorer.score_many(cleaned)
+        with METRICS.stage('vectorize', len(cleaned)):
+            vec_text = self.nlp_vectorizer.transform(cleaned)
+        with METRICS.stage('nlp_predict', len(cleaned)):
+            return self.nlp_model.predict_proba(vec_text)[:, 1]
+
+    def predict_risk(self, features, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Ensemble risk probabilities, scored ``chunk_size`` rows at a time"""
+        with METRICS.stage('ensemble_predict', len(features)):
+            if self.compiled_model is not None:
+                return self.compiled_model.predict_risk(features)
+            parts = [
+                self.final_model.predict_proba(features.iloc[start:start + chunk_size])[:, 1]
+                for start in range(0, len(features), chunk_size)
+            ]
+            return np.concatenate(parts) if parts else np.empty(0)
+
+    def score_one(self, raw, journal=""):
+        """Score one student given a mapping of RAW_COLUMNS and their journal text"""
+        raw_df = pd.DataFrame({col: [raw[col]] for col in raw})
+        with METRICS.stage('clean_text'):
+            cleaned = clean_one(journal, self.max_text_chars)
+        if self.cache is None:
+            nlp_prob = float(self.score_cleaned([cleaned])[0])
+            with METRICS.stage('features'):
+                features = calculate_features(raw_df, nlp_prob)
+            risk_prob = float(self.predict_risk(features)[0])
+        else:
+            text_key = self.cache.text_key(cleaned)
+            nlp_prob = self.cache.nlp.get(text_key)
+            if nlp_prob is None:
+                nlp_prob = float(self.score_cleaned([cleaned])[0])
+                self.cache.nlp.put(text_key, nlp_prob)
+            with METRICS.stage('features'):
+                features = calculate_features(raw_df, nlp_prob)
+            risk_key = self.cache.risk_key(features.to_numpy(dtype=np.float64), text_key)
+            risk_prob = self.cache.risk.get(risk_key)
+            if risk_prob is None:
+                risk_prob = float(self.predict_risk(features)[0])
+                self.cache.risk.put(risk_key, risk_prob)
+        if self.drift is not None:
+            self.drift.update(features, risk_prob)
+        return {
+            'nlp_prob': nlp_prob,
+            'risk_prob': risk_prob,
+            'risk_level': risk_level(risk_prob),
+            'features': features,
+            'model_version': self.model_version,
+        }
+
+    def score_many(self, raw_df, text_column='journal_entry', chunk_size=DEFAULT_CHUNK_SIZE):
+        """Score a cohort of raw rows: ``nlp_stress_score``/``risk_prob``/``risk_level`` tagged with ``model_version``.
+
+        Without ``text_column``, an existing ``nlp_stress_score`` column is used as is. With a
+        ``cascade`` set, clear-cut rows skip the ensemble and an ``escalated`` column is added. With
+        ``drift`` set, every row's features and risk are added to the monitor.
+        """
+        raw = prepare_raw(raw_df)
+
+        if text_column not in raw_df and 'nlp_stress_score' in raw_df:
+            # Precomputed stress (e.g. journal_stream rolling values); gaps score as an empty journal
+            nlp_scores = raw_df['nlp_stress_score'].to_numpy(dtype=np.float64)
+            nlp_scores = np.where(np.isnan(nlp_scores), self.score_cleaned([""])[0], nlp_scores)
+        else:
+            texts = raw_df[text_column].tolist() if text_column in raw_df else [""] * len(raw)
+            nlp_scores = self.score_texts(texts)
+        with METRICS.stage('features', len(raw)):
+            features = calculate_features(raw, nlp_scores)
+        escalated = None
+        if self.cascade is not None:
+            risk_probs, escalated = self.cascade.predict(features, lambda rows: self.predict_risk(rows, chunk_size))
+        else:
+            risk_probs = self.predict_risk(features, chunk_size)
+        if self.drift is not None:
+            self.drift.update(features, risk_probs)
+
+        scores = pd.DataFrame({
+            'nlp_stress_score': nlp_scores,
+            'risk_prob': risk_probs,
+            'risk_level': np.where(risk_probs > HIGH_RISK, 'HIGH', np.where(risk_probs > MEDIUM_RISK, 'MEDIUM', 'LOW')),
+            'model_version': self.model_version,
+        }, index=raw_df.index)
+        if escalated is not None:
+            scores['escalated'] = escalated
+        return scores
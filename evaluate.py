@@ -0,0 +1,328 @@
+"""Threshold and calibration evaluation against labelled outcomes.
+
+A labelled export (the raw columns, a journal column and a 0/1 outcome) is
+scored in one batched ``RiskEngine.score_many`` pass. A student counts as
+flagged at threshold ``t`` when ``risk_prob >= t``, except at the MEDIUM/HIGH
+band cut-offs, which flag ``risk_prob > t`` like ``engine.risk_level``. The
+tool then reports:
+
+* the exact precision/recall curve, from one sort of the scores and
+  cumulative sums of the sorted labels (one point per distinct score),
+  with average precision, the best-F1 threshold and the threshold that
+  reaches ``--target-recall``;
+* precision/recall/F1 at ``DECISION_THRESHOLD`` and the MEDIUM/HIGH band
+  cut-offs, with the observed outcome rate per LOW/MEDIUM/HIGH band;
+* a reliability (calibration) curve and the expected calibration error;
+* bootstrap confidence intervals for all of the above.
+
+The bootstrap does not materialize resampled rows. Every metric here depends
+only on how many positive and negative rows fall between consecutive grid
+thresholds. Resampling n rows with replacement is therefore the same as one
+multinomial draw over those (bin, label) cells. ``bootstrap`` draws all
+resamples as one ``(resamples, cells)`` count matrix, and suffix cumulative
+sums turn it into confusion counts at every grid threshold for every
+resample at once.
+
+Usage:
+    python evaluate.py outcomes.csv --label-column dropped_out
+    python evaluate.py scored.csv --label-column dropped_out --score-column risk_prob -o eval.json
+    python evaluate.py --synthetic 100000 --resamples 1000
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_score import read_table, synthetic_cohort, write_table
+from engine import DECISION_THRESHOLD, HIGH_RISK, MEDIUM_RISK, MODEL_PATH, RiskEngine
+
+DEFAULT_GRID = 2000
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CALIBRATION_BINS = 10
+DEFAULT_TARGET_RECALL = 0.85
+CONFIDENCE = 0.95
+
+NAMED_THRESHOLDS = {
+    'decision': DECISION_THRESHOLD,
+    'medium_band': MEDIUM_RISK,
+    'high_band': HIGH_RISK,
+}
+# Named thresholds that flag with a strict '>' (engine.risk_level), in band order
+STRICT_THRESHOLDS = ('medium_band', 'high_band')
+
+
+# ==========================================
+# 1. EXACT CURVES
+# ==========================================
+def check_labels(labels):
+    """Labels as a 0/1 int8 array; raises on anything that is not binary"""
+    labels = np.asarray(labels)
+    if labels.dtype == object:
+        labels = pd.Series(labels).map({'Yes': 1, 'No': 0, True: 1, False: 0}).fillna(pd.Series(labels)).to_numpy()
+    values = pd.unique(labels)
+    if not set(values.tolist()) <= {0, 1}:
+        raise ValueError(f"Labels must be 0/1 (or Yes/No); got {sorted(map(str, values))[:5]}")
+    return labels.astype(np.int8)
+
+
+def precision_recall_curve(labels, scores):
+    """Precision, recall and F1 at every distinct score, highest threshold first"""
+    order = np.argsort(-scores, kind='stable')
+    ranked = scores[order]
+    tp = np.cumsum(labels[order], dtype=np.int64)
+    # The last row of each run of equal scores closes that threshold
+    last = np.r_[np.flatnonzero(np.diff(ranked)), len(ranked) - 1]
+    tp = tp[last]
+    flagged = last + 1
+    positives = max(int(tp[-1]) if len(tp) else 0, 1)
+    precision = tp / flagged
+    recall = tp / positives
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros_like(precision), where=precision + recall > 0)
+    return pd.DataFrame({'threshold': ranked[last], 'flagged': flagged, 'tp': tp, 'fp': flagged - tp,
+                         'precision': precision, 'recall': recall, 'f1': f1})
+
+
+def average_precision(curve):
+    """Area under the step precision/recall curve (sklearn's definition)"""
+    recall = curve['recall'].to_numpy()
+    return float(np.sum(np.diff(recall, prepend=0.0) * curve['precision'].to_numpy()))
+
+
+def calibration_curve(labels, scores, bins=DEFAULT_CALIBRATION_BINS):
+    """Per equal-width bin: count, mean predicted risk and observed outcome rate, plus the ECE"""
+    index = np.minimum((scores * bins).astype(np.int64), bins - 1)
+    count = np.bincount(index, minlength=bins)
+    predicted = np.bincount(index, weights=scores, minlength=bins)
+    observed = np.bincount(index, weights=labels, minlength=bins)
+    nonempty = count > 0
+    table = pd.DataFrame({
+        'bin_low': np.arange(bins) / bins,
+        'bin_high': np.arange(1, bins + 1) / bins,
+        'count': count,
+        'mean_predicted': np.divide(predicted, count, out=np.full(bins, np.nan), where=nonempty),
+        'observed_rate': np.divide(observed, count, out=np.full(bins, np.nan), where=nonempty),
+    })
+    ece = float(np.abs(observed - predicted).sum() / max(len(scores), 1))
+    return table, ece
+
+
+# ==========================================
+# 2. GRID METRICS AND BOOTSTRAP
+# ==========================================
+def grid_threshold(name, threshold):
+    """The ``>=`` grid threshold that flags the same rows as the named ``threshold``"""
+    # score > t is score >= the next float above t
+    return float(np.nextafter(threshold, np.inf)) if name in STRICT_THRESHOLDS else threshold
+
+
+def threshold_grid(points=DEFAULT_GRID, extra=()):
+    """Evenly spaced thresholds on [0, 1] plus any named ones, sorted"""
+    return np.unique(np.concatenate([np.linspace(0.0, 1.0, points + 1), np.asarray(extra, dtype=np.float64)]))
+
+
+def cell_counts(labels, scores, thresholds):
+    """Negative/positive row counts per cell between consecutive thresholds, shape (len(thresholds) + 1, 2)"""
+    cells = np.searchsorted(thresholds, scores, side='right')
+    return np.bincount(cells * 2 + labels, minlength=2 * (len(thresholds) + 1)).reshape(-1, 2)
+
+
+def grid_metrics(counts):
+    """Confusion-based metrics at every grid threshold from cell counts of shape (..., cells, 2)"""
+    # Cell k holds scores in [thresholds[k-1], thresholds[k]); threshold j flags cells j+1 onwards
+    suffix = np.cumsum(counts[..., ::-1, :], axis=-2)[..., ::-1, :]
+    fp, tp = suffix[..., 1:, 0].astype(np.float64), suffix[..., 1:, 1].astype(np.float64)
+    positives = suffix[..., :1, 1]
+    total = positives + suffix[..., :1, 0]
+    flagged = tp + fp
+    precision = np.divide(tp, flagged, out=np.zeros_like(tp), where=flagged > 0)
+    recall = np.divide(tp, positives, out=np.zeros_like(tp), where=positives > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros_like(tp), where=precision + recall > 0)
+    return {'precision': precision, 'recall': recall, 'f1': f1,
+            'flagged_rate': np.divide(flagged, total, out=np.zeros_like(tp), where=total > 0)}
+
+
+def band_rates(counts, thresholds):
+    """Row count and observed outcome rate of the LOW/MEDIUM/HIGH bands from cell counts"""
+    # A band starts at the cell that begins at its grid threshold, as in engine.risk_level
+    edges = np.searchsorted(thresholds, [grid_threshold(name, NAMED_THRESHOLDS[name]) for name in STRICT_THRESHOLDS],
+                            side='left') + 1
+    out = {}
+    for band, cells in zip(['LOW', 'MEDIUM', 'HIGH'], np.split(np.arange(counts.shape[-2]), edges)):
+        rows = counts[..., cells, :].sum(axis=-2).astype(np.float64)
+        n = rows.sum(axis=-1)
+        out[band] = (n, np.divide(rows[..., 1], n, out=np.full_like(n, np.nan), where=n > 0))
+    return out
+
+
+def bootstrap(labels, scores, thresholds, resamples=DEFAULT_RESAMPLES, calibration_bins=DEFAULT_CALIBRATION_BINS,
+              seed=0):
+    """Grid metrics, band rates and ECE for ``resamples`` bootstrap resamples, drawn as one count matrix"""
+    counts = cell_counts(labels, scores, thresholds)
+    n = len(labels)
+    draws = np.random.default_rng(seed).multinomial(n, counts.ravel() / n, size=resamples)
+    draws = draws.reshape(resamples, -1, 2)
+
+    metrics = grid_metrics(draws)
+    metrics['bands'] = band_rates(draws, thresholds)
+
+    # Calibration per resample: each cell keeps its observed mean score
+    cells = np.searchsorted(thresholds, scores, side='right')
+    cell_rows = counts.sum(axis=1)
+    cell_mean = np.divide(np.bincount(cells, weights=scores, minlength=len(cell_rows)), cell_rows,
+                          out=np.zeros(len(cell_rows)), where=cell_rows > 0)
+    lower = np.r_[0.0, thresholds]
+    cell_bin = np.minimum((lower * calibration_bins + 1e-9).astype(np.int64), calibration_bins - 1)
+    rows = draws.sum(axis=2)
+    predicted = np.zeros((resamples, calibration_bins))
+    observed = np.zeros((resamples, calibration_bins))
+    np.add.at(predicted.T, cell_bin, (rows * cell_mean).T)
+    np.add.at(observed.T, cell_bin, draws[:, :, 1].T)
+    metrics['ece'] = np.abs(observed - predicted).sum(axis=1) / n
+    return metrics
+
+
+def interval(samples, confidence=CONFIDENCE):
+    """Percentile confidence interval along the resample axis"""
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.nanquantile(samples, [alpha, 1.0 - alpha], axis=0)
+    return low, high
+
+
+# ==========================================
+# 3. EVALUATION
+# ==========================================
+def evaluate(labels, scores, grid_points=DEFAULT_GRID, resamples=DEFAULT_RESAMPLES,
+             calibration_bins=DEFAULT_CALIBRATION_BINS, target_recall=DEFAULT_TARGET_RECALL, seed=0):
+    """Full evaluation report as a JSON-ready dict (plus the exact curve and calibration table)"""
+    labels = check_labels(labels)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) != len(labels) or not len(scores):
+        raise ValueError("Need one score per label and at least one row")
+
+    curve = precision_recall_curve(labels, scores)
+    reaching = curve[curve['recall'] >= target_recall]
+    # Highest threshold that still reaches the target recall
+    target = float(reaching['threshold'].iloc[0]) if len(reaching) else float(curve['threshold'].iloc[-1])
+    best = curve.loc[curve['f1'].idxmax()]
+    named = dict(NAMED_THRESHOLDS, target_recall=target, best_f1=float(best['threshold']))
+
+    thresholds = threshold_grid(grid_points, [grid_threshold(name, threshold) for name, threshold in named.items()])
+    observed = grid_metrics(cell_counts(labels, scores, thresholds))
+    samples = bootstrap(labels, scores, thresholds, resamples, calibration_bins, seed)
+    calibration, ece = calibration_curve(labels, scores, calibration_bins)
+
+    report = {
+        'rows': int(len(labels)),
+        'positives': int(labels.sum()),
+        'resamples': resamples,
+        'confidence': CONFIDENCE,
+        'average_precision': average_precision(curve),
+        'ece': ece,
+        'ece_ci': [float(v) for v in interval(samples['ece'])],
+        'thresholds': {},
+        'bands': {},
+    }
+    for name, threshold in named.items():
+        j = int(np.searchsorted(thresholds, grid_threshold(name, threshold)))
+        entry = {'threshold': float(threshold)}
+        for metric in ('precision', 'recall', 'f1', 'flagged_rate'):
+            low, high = interval(samples[metric][:, j])
+            entry[metric] = float(observed[metric][j])
+            entry[f'{metric}_ci'] = [float(low), float(high)]
+        report['thresholds'][name] = entry
+    observed_bands = band_rates(cell_counts(labels, scores, thresholds), thresholds)
+    for band, (n, rate) in observed_bands.items():
+        low, high = interval(samples['bands'][band][1])
+        report['bands'][band] = {'rows': int(n), 'observed_rate': None if np.isnan(rate) else float(rate),
+                                 'observed_rate_ci': [float(low), float(high)]}
+    return report, curve, calibration
+
+
+def labelled_scores(engine, cohort, label_column, score_column=None, text_column='journal_entry'):
+    """``(labels, scores)``; scores come from ``score_column`` or one batched ``score_many`` pass"""
+    if label_column not in cohort:
+        raise KeyError(f"No label column {label_column!r} in input")
+    if score_column:
+        return cohort[label_column].to_numpy(), cohort[score_column].to_numpy(dtype=np.float64)
+    return cohort[label_column].to_numpy(), engine.score_many(cohort, text_column=text_column)['risk_prob'].to_numpy()
+
+
+def synthetic_outcomes(engine, n, seed=0):
+    """Synthetic cohort whose outcomes are drawn from the model's own risk (a calibrated reference)"""
+    cohort = synthetic_cohort(n, seed=seed)
+    risk = engine.score_many(cohort)['risk_prob'].to_numpy()
+    cohort['outcome'] = (np.random.default_rng(seed + 1).uniform(size=n) < risk).astype(np.int8)
+    return cohort
+
+
+def print_report(report, calibration):
+    ci = lambda values: f"[{values[0]:.3f}, {values[1]:.3f}]"
+    print(f"{report['rows']:,} rows, {report['positives']:,} positives, {report['resamples']:,} bootstrap resamples "
+          f"({report['confidence']:.0%} CIs)")
+    print(f"average precision {report['average_precision']:.3f}   ECE {report['ece']:.4f} {ci(report['ece_ci'])}")
+    print(f"\n{'threshold':<14} {'value':>7} {'precision':>22} {'recall':>22} {'f1':>22} {'flagged':>8}")
+    for name, entry in report['thresholds'].items():
+        print(f"{name:<14} {entry['threshold']:>7.4f} "
+              + " ".join(f"{entry[m]:>6.3f} {ci(entry[m + '_ci']):>15}" for m in ('precision', 'recall', 'f1'))
+              + f" {entry['flagged_rate']:>8.1%}")
+    print(f"\n{'band':<8} {'rows':>9} {'observed rate':>30}")
+    for band, entry in report['bands'].items():
+        rate = entry['observed_rate']
+        print(f"{band:<8} {entry['rows']:>9,} " + (f"{rate:>7.3f} {ci(entry['observed_rate_ci']):>22}"
+                                                     if rate is not None else f"{'-':>30}"))
+    print("\ncalibration")
+    print(calibration.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate thresholds and calibration on labelled outcomes")
+    parser.add_argument('input', nargs='?', help="CSV/Parquet export with raw columns, journals and outcomes")
+    parser.add_argument('--label-column', default='outcome', help="0/1 (or Yes/No) outcome column")
+    parser.add_argument('--score-column', help="Evaluate this existing score column instead of re-scoring")
+    parser.add_argument('--text-column', default='journal_entry')
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES, help="Bootstrap resamples for the confidence intervals")
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID, help="Evenly spaced thresholds for the CIs")
+    parser.add_argument('--calibration-bins', type=int, default=DEFAULT_CALIBRATION_BINS)
+    parser.add_argument('--target-recall', type=float, default=DEFAULT_TARGET_RECALL)
+    parser.add_argument('--synthetic', type=int, metavar='N', help="Evaluate on N synthetic students with simulated outcomes")
+    parser.add_argument('-o', '--output', help="Write the report as JSON")
+    parser.add_argument('--curve', help="Write the exact precision/recall curve (CSV/Parquet)")
+    args = parser.parse_args(argv)
+    if not args.input and not args.synthetic:
+        parser.error("an input file or --synthetic N is required")
+
+    engine = None if args.score_column else RiskEngine.load(args.model, compiled=True)
+    if args.synthetic:
+        engine = engine or RiskEngine.load(args.model, compiled=True)
+        cohort = synthetic_outcomes(engine, args.synthetic)
+        args.label_column = 'outcome'
+    else:
+        cohort = read_table(args.input)
+
+    start = time.perf_counter()
+    labels, scores = labelled_scores(engine, cohort, args.label_column, args.score_column, args.text_column)
+    scored = time.perf_counter()
+    report, curve, calibration = evaluate(labels, scores, args.grid, args.resamples,
+                                          args.calibration_bins, args.target_recall)
+    done = time.perf_counter()
+    report['seconds'] = {'scoring': scored - start, 'evaluation': done - scored}
+
+    print_report(report, calibration)
+    print(f"\nscored in {scored - start:.2f}s, evaluated in {done - scored:.2f}s", file=sys.stderr)
+    if args.output:
+        report['calibration'] = calibration.to_dict(orient='records')
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.curve:
+        write_table(curve, args.curve)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Embedded SQLite history of scored assessments.
+
+Every assessment (student id, the model's input columns including the
+engineered features, NLP stress, risk, model version and timestamp) is one
+row in ``assessments``, indexed on ``(student_id, scored_at)`` and on
+``scored_at``. Writes go through a bounded queue to a background thread
+that commits them in batches, so the scoring path never waits on disk.
+Reads open their own WAL connection, so range queries run while the writer
+is busy.
+
+Usage:
+    python history_store.py history.db --student STU-2024-001
+    python history_store.py history.db --export cohort.csv --since 2024-09-01
+    python history_store.py /tmp/bench.db --benchmark 1000000
+"""
+import argparse
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from engine import FEATURE_COLUMNS
+
+HISTORY_DB = 'assessment_history.db'
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_QUEUE_SIZE = 100000
+EXPORT_CHUNK_ROWS = 50000
+
+META_COLUMNS = ['student_id', 'name', 'scored_at', 'model_version', 'risk_prob', 'risk_level']
+# FEATURE_COLUMNS already holds the raw inputs, nlp_stress_score and the engineered features
+COLUMNS = META_COLUMNS + FEATURE_COLUMNS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT,
+    name TEXT,
+    scored_at REAL NOT NULL,
+    model_version TEXT,
+    risk_prob REAL NOT NULL,
+    risk_level TEXT,
+    {", ".join(f"{col} REAL" for col in FEATURE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_student_time ON assessments (student_id, scored_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_time ON assessments (scored_at);
+"""
+
+_INSERT = f"INSERT INTO assessments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+_STOP = object()
+
+
+def _timestamp(value):
+    """Unix seconds from a datetime, ISO date string or number (None passes through)"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    """Assessment history with a background batched writer and indexed range reads"""
+
+    def __init__(self, path=HISTORY_DB, batch_size=DEFAULT_BATCH_SIZE, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        with _connect(path) as conn:
+            conn.executescript(SCHEMA)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name='history-writer')
+        self._writer.start()
+
+    def record(self, student_id, risk_prob, features, name=None, model_version=None, risk_level=None,
+               scored_at=None):
+        """Queue one assessment; ``features`` maps FEATURE_COLUMNS (a one-row frame works too).
+
+        Never blocks: if the writer has fallen ``queue_size`` rows behind, the
+        row is dropped and counted in ``dropped``.
+        """
+        if hasattr(features, 'iloc'):
+            features = features.iloc[0]
+        row = (student_id, name, _timestamp(scored_at) or time.time(), model_version, float(risk_prob),
+               risk_level) + tuple(float(features[col]) for col in FEATURE_COLUMNS)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def record_frame(self, frame, model_version=None, scored_at=None):
+        """Queue a scored cohort: FEATURE_COLUMNS, ``risk_prob`` and optional ``student_id``/``name``/``risk_level``.
+
+        A ``scored_at`` column (unix seconds) overrides the single ``scored_at`` argument, e.g. for backfills.
+        """
+        n = len(frame)
+        if 'scored_at' in frame:
+            times = frame['scored_at'].astype(float).tolist()
+        else:
+            times = [_timestamp(scored_at) or time.time()] * n
+        columns = [
+            frame[col].tolist() if col in frame else [None] * n for col in ('student_id', 'name')
+        ] + [
+            times, [model_version] * n, frame['risk_prob'].astype(float).tolist(),
+            frame['risk_level'].tolist() if 'risk_level' in frame else [None] * n,
+        ] + [frame[col].astype(float).tolist() for col in FEATURE_COLUMNS]
+        for row in zip(*columns):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        while True:
+            row = self._queue.get()
+            if row is _STOP:
+                self._queue.task_done()
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_seconds
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            try:
+                with conn:
+                    conn.executemany(_INSERT, batch)
+                self.written += len(batch)
+            except sqlite3.Error:
+                self.errors += len(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                break
+        conn.close()
+
+    def flush(self):
+        """Block until every queued row has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """Commit what is queued and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, check_same_thread=False)
+        return conn
+
+    def _query(self, sql, params=(), chunksize=None):
+        return pd.read_sql_query(sql, self._reader(), params=params, chunksize=chunksize)
+
+    @staticmethod
+    def _range(since, until):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("scored_at >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append("scored_at < ?")
+            params.append(_timestamp(until))
+        return clauses, params
+
+    def student_history(self, student_id, since=None, until=None, columns=None):
+        """One student's assessments in time order (served from the student/time index)"""
+        clauses, params = self._range(since, until)
+        where = " AND ".join(["student_id = ?"] + clauses)
+        frame = self._query(
+            f"SELECT {', '.join(columns or COLUMNS)} FROM assessments WHERE {where} ORDER BY scored_at",
+            [student_id] + params,
+        )
+        if 'scored_at' in frame:
+            frame['scored_at'] = pd.to_datetime(frame['scored_at'], unit='s')
+        return frame
+
+    def iter_range(self, since=None, until=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """All assessments in ``[since, until)`` as DataFrame chunks, oldest first"""
+        clauses, params = self._range(since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        for chunk in self._query(f"SELECT {', '.join(COLUMNS)} FROM assessments {where} ORDER BY scored_at",
+                                 params, chunksize=chunk_rows):
+            chunk['scored_at'] = pd.to_datetime(chunk['scored_at'], unit='s')
+            yield chunk
+
+    def export(self, path, since=None, until=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Stream a time range to CSV in chunks; returns the row count"""
+        rows = 0
+        for i, chunk in enumerate(self.iter_range(since, until, chunk_rows)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(chunk)
+        if rows == 0:
+            pd.DataFrame(columns=COLUMNS).to_csv(path, index=False)
+        return rows
+
+    def latest_per_student(self, until=None):
+        """Most recent assessment per student at ``until`` (default: now)"""
+        clauses, params = self._range(None, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        frame = self._query(
+            f"SELECT {', '.join(COLUMNS)} FROM assessments WHERE id IN ("
+            f"SELECT id FROM (SELECT id, MAX(scored_at) FROM assessments {where} GROUP BY student_id))",
+            params,
+        )
+        frame['scored_at'] = pd.to_datetime(frame['scored_at'], unit='s')
+        return frame
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+
+
+def benchmark(path, n_rows, students=50000):
+    """Write throughput through the batched writer plus indexed query latencies"""
+    import numpy as np
+
+    from batch_score import synthetic_cohort
+    from engine import RAW_COLUMNS, calculate_features
+
+    cohort = synthetic_cohort(min(n_rows, 100000), seed=5)
+    frame = calculate_features(cohort[RAW_COLUMNS], np.random.default_rng(5).uniform(0, 1, len(cohort)))
+    frame['risk_prob'] = np.random.default_rng(6).uniform(0, 1, len(cohort))
+    frame['student_id'] = [f"STU-{i % students:06d}" for i in range(len(cohort))]
+
+    store = HistoryStore(path, batch_size=5000)
+    # Spread the rows evenly over the last year
+    day = 86400.0
+    now = time.time()
+    start = time.perf_counter()
+    written = 0
+    while written < n_rows:
+        part = frame.iloc[:n_rows - written].copy()
+        part['scored_at'] = now - 365 * day * (1 - (written + np.arange(len(part))) / n_rows)
+        store.record_frame(part, model_version='bench')
+        written += len(part)
+        store.flush()
+    write_seconds = time.perf_counter() - start
+
+    timings = {}
+    for label, fn in [
+        ('student_history', lambda: store.student_history("STU-000042")),
+        ('last_week_range', lambda: sum(len(c) for c in store.iter_range(since=now - 7 * day))),
+        ('latest_per_student', lambda: store.latest_per_student()),
+    ]:
+        start = time.perf_counter()
+        rows = fn()
+        timings[label] = (time.perf_counter() - start, rows if isinstance(rows, int) else len(rows))
+    total = store.count()
+    store.close()
+    return {'rows': total, 'rows_per_s': n_rows / write_seconds, 'query_seconds': timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or benchmark the assessment history store")
+    parser.add_argument('db', nargs='?', default=HISTORY_DB, help="SQLite history database")
+    parser.add_argument('--student', help="Print one student's history")
+    parser.add_argument('--export', metavar='CSV', help="Export a time range to CSV")
+    parser.add_argument('--since', help="Range start (ISO date/time)")
+    parser.add_argument('--until', help="Range end, exclusive (ISO date/time)")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="Insert N synthetic rows and time queries")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        result = benchmark(args.db, args.benchmark)
+        print(f"{result['rows']:,} rows in store, wrote {result['rows_per_s']:,.0f} rows/s")
+        for label, (seconds, rows) in result['query_seconds'].items():
+            print(f"{label:<20} {seconds * 1000:>9.1f} ms  {rows:>9,} rows")
+        return 0
+
+    store = HistoryStore(args.db)
+    try:
+        if args.student:
+            print(store.student_history(args.student, args.since, args.until).to_string(index=False))
+        if args.export:
+            rows = store.export(args.export, args.since, args.until)
+            print(f"Exported {rows:,} assessments to {args.export}", file=sys.stderr)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
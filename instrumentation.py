@@ -0,0 +1,305 @@
+"""In-process latency and throughput instrumentation for the scoring pipeline.
+
+``METRICS.stage(name, items)`` times one pipeline stage (model load, text
+cleaning, vectorization, NLP predict, feature engineering, ensemble predict,
+report generation) into a per-stage histogram and item counter. The
+registry renders Prometheus/OpenMetrics text for a file or an HTTP
+``/metrics`` endpoint. ``METRICS.trace(...)`` additionally collects every
+stage of one request into a JSON line.
+
+Instrumentation is off unless ``VALKYRIE_METRICS=1`` (or ``METRICS.enable()``);
+when off, ``stage`` returns a shared no-op context manager, so the cost is a
+single attribute check per stage.
+
+Environment:
+    VALKYRIE_METRICS=1              turn instrumentation on
+    VALKYRIE_METRICS_FILE=path      rewrite the OpenMetrics text there every 15 s
+    VALKYRIE_METRICS_PORT=9464      serve ``/metrics`` from a background thread
+    VALKYRIE_TRACE_FILE=path        append one JSON trace per request
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = 'valkyrie'
+
+# How often VALKYRIE_METRICS_FILE is rewritten; node_exporter's textfile collector reads it per scrape
+DEFAULT_WRITE_SECONDS = 15.0
+
+
+# ==========================================
+# 1. HISTOGRAMS
+# ==========================================
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative counts are computed on render)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """``(upper bound, cumulative count)`` pairs ending with ``+Inf``"""
+        total, out = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+class _NoopStage:
+    """Shared stand-in for ``Stage`` when instrumentation is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+class Stage:
+    """Times one stage into the registry (and the active trace, if any)"""
+
+    __slots__ = ('registry', 'name', 'items', 'start')
+
+    def __init__(self, registry, name, items):
+        self.registry = registry
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.items,
+                              error=exc_type is not None, start=self.start)
+        return False
+
+
+# ==========================================
+# 2. REGISTRY AND TRACES
+# ==========================================
+class MetricsRegistry:
+    """Per-stage histograms, item counters and error counters"""
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS, trace_path=None):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.trace_path = trace_path
+        self._histograms = {}
+        self._items = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, trace_path=None):
+        self.enabled = True
+        if trace_path is not None:
+            self.trace_path = trace_path
+
+    def disable(self):
+        self.enabled = False
+
+    def stage(self, name, items=1):
+        """Context manager timing one pipeline stage"""
+        if not self.enabled:
+            return _NOOP
+        return Stage(self, name, items)
+
+    def observe(self, name, seconds, items=1, error=False, start=None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._items[name] = self._items.get(name, 0) + items
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            if start is None:
+                start = time.perf_counter() - seconds
+            trace['spans'].append({
+                'stage': name,
+                'offset_ms': round((start - trace['_start']) * 1000, 3),
+                'duration_ms': round(seconds * 1000, 3),
+                'items': items,
+                'error': error,
+            })
+
+    def trace(self, **fields):
+        """Context manager collecting every stage of one request into a JSON trace"""
+        if not self.enabled:
+            return _NOOP
+        return _Trace(self, fields)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._items.clear()
+            self._errors.clear()
+
+    def snapshot(self):
+        """Plain-dict view: per stage count, total seconds, items and errors"""
+        with self._lock:
+            return {
+                name: {
+                    'count': histogram.count,
+                    'seconds': histogram.sum,
+                    'items': self._items.get(name, 0),
+                    'errors': self._errors.get(name, 0),
+                }
+                for name, histogram in self._histograms.items()
+            }
+
+    def render(self):
+        """Prometheus/OpenMetrics text exposition of every stage"""
+        seconds = f"{METRIC_PREFIX}_stage_duration_seconds"
+        items = f"{METRIC_PREFIX}_stage_items"
+        errors = f"{METRIC_PREFIX}_stage_errors"
+        lines = [
+            f"# TYPE {seconds} histogram",
+            f"# UNIT {seconds} seconds",
+            f"# HELP {seconds} Wall time per pipeline stage call.",
+        ]
+        with self._lock:
+            stages = sorted(self._histograms)
+            for name in stages:
+                histogram = self._histograms[name]
+                for bound, count in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{seconds}_bucket{{stage="{name}",le="{le}"}} {count}')
+                lines.append(f'{seconds}_count{{stage="{name}"}} {histogram.count}')
+                lines.append(f'{seconds}_sum{{stage="{name}"}} {histogram.sum!r}')
+            lines += [f"# TYPE {items} counter", f"# HELP {items} Rows or texts processed per pipeline stage."]
+            lines += [f'{items}_total{{stage="{name}"}} {self._items.get(name, 0)}' for name in stages]
+            lines += [f"# TYPE {errors} counter", f"# HELP {errors} Pipeline stage calls that raised."]
+            lines += [f'{errors}_total{{stage="{name}"}} {self._errors.get(name, 0)}' for name in stages]
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path=None):
+        """Atomically write the OpenMetrics text (for node_exporter's textfile collector and the like)"""
+        path = path or os.environ.get('VALKYRIE_METRICS_FILE')
+        if not path:
+            return None
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+        return path
+
+    def write_periodically(self, path, interval=DEFAULT_WRITE_SECONDS):
+        """Write ``path`` now, then rewrite it every ``interval`` seconds from a daemon thread"""
+        # The first write runs here so a bad path fails on the caller's thread
+        self.write_file(path)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_file(path)
+                except OSError:
+                    # Transient (disk full, directory briefly gone): the next write retries
+                    pass
+
+        thread = threading.Thread(target=run, daemon=True, name='metrics-file')
+        thread.start()
+        return thread
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve ``GET /metrics`` from a daemon thread; returns the server"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+        return server
+
+
+class _Trace:
+    """Collects the spans of one request on this thread and appends them to ``trace_path``"""
+
+    def __init__(self, registry, fields):
+        self.registry = registry
+        self.record = dict(fields)
+
+    def __enter__(self):
+        self.record['spans'] = []
+        self.record['_start'] = time.perf_counter()
+        self.registry._local.trace = self.record
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry._local.trace = None
+        record = self.record
+        record['total_ms'] = round((time.perf_counter() - record.pop('_start')) * 1000, 3)
+        record['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        path = self.registry.trace_path
+        if path:
+            line = json.dumps(record, default=str)
+            with self.registry._lock, open(path, 'a') as f:
+                f.write(line + "\n")
+        return False
+
+
+def registry_from_env(environ=os.environ):
+    """Registry configured from the VALKYRIE_* environment variables"""
+    return MetricsRegistry(
+        enabled=environ.get('VALKYRIE_METRICS', '').lower() in ('1', 'true', 'yes'),
+        trace_path=environ.get('VALKYRIE_TRACE_FILE'),
+    )
+
+
+# Process-wide registry used by engine.py, report_templates.py and the servers
+METRICS = registry_from_env()
+
+_exporters_started = False
+
+
+def start_from_env():
+    """Start the ``/metrics`` endpoint and the file writer configured by VALKYRIE_METRICS_* (once per process)"""
+    global _exporters_started
+    if not METRICS.enabled or _exporters_started:
+        return
+    _exporters_started = True
+    port = os.environ.get('VALKYRIE_METRICS_PORT')
+    if port:
+        METRICS.serve(int(port))
+    path = os.environ.get('VALKYRIE_METRICS_FILE')
+    if path:
+        METRICS.write_periodically(path)
@@ -0,0 +1,222 @@
+"""Streaming journal-entry ingestion with rolling stress per student.
+
+Reads large JSONL files of daily journal entries in bounded chunks, runs
+``clean_texts`` and the stress model once per chunk, and folds the scores
+into a per-student rolling aggregate (EWMA or fixed-window mean). Both are
+keyed on each entry's date rather than its position, so the file does not
+need to be sorted. Memory is one chunk plus a constant-size state per
+student, regardless of file size.
+
+Each line is a JSON object such as::
+
+    {"student_id": "STU-2024-001", "date": "2024-03-01", "entry": "Feeling fine today"}
+
+``date`` is an ISO 8601 date or timestamp and ``student_id`` a string or
+integer. Lines that are not JSON objects, or lack a valid id or date, are
+counted as malformed and skipped.
+
+Usage:
+    python journal_stream.py entries.jsonl -o rolling_stress.csv
+    python journal_stream.py entries.jsonl -o rolling_stress.csv --window 14
+
+The snapshot's ``nlp_stress_score`` column can be joined onto a cohort export
+(``RollingStress.attach``) and scored with ``RiskEngine.score_many``, which
+uses it in place of a journal text column.
+"""
+import argparse
+import heapq
+import json
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import MODEL_PATH, RiskEngine
+from text_normalize import clean_texts
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_ALPHA = 0.3
+EPOCH = pd.Timestamp(0, tz='UTC')
+ONE_DAY = pd.Timedelta(days=1)
+
+
+# ==========================================
+# 1. CHUNKED READING AND SCORING
+# ==========================================
+def read_jsonl_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, errors=None):
+    """Yield lists of at most ``chunk_size`` parsed records; malformed lines are counted in ``errors``"""
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            if not isinstance(record, dict):
+                if errors is not None:
+                    errors['malformed'] = errors.get('malformed', 0) + 1
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def entry_days(values):
+    """Days since the epoch for ISO dates or timestamps; NaN where missing or unparseable"""
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True, format='ISO8601')
+    return ((parsed - EPOCH) / ONE_DAY).to_numpy(dtype=np.float64)
+
+
+def _valid_id(value):
+    """Student ids are strings or integers (not null, lists, objects or booleans)"""
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def score_chunks(engine, chunks, id_field='student_id', text_field='entry', date_field='date', errors=None):
+    """Yield ``(student_ids, days, stress_scores)`` per chunk; records without a valid id or date count in ``errors``"""
+    for chunk in chunks:
+        days = entry_days([record.get(date_field) for record in chunk])
+        valid = ~np.isnan(days) & np.fromiter((_valid_id(record.get(id_field)) for record in chunk), bool, len(chunk))
+        if not valid.all():
+            if errors is not None:
+                errors['malformed'] = errors.get('malformed', 0) + int(len(chunk) - valid.sum())
+            chunk = [record for record, keep in zip(chunk, valid.tolist()) if keep]
+            days = days[valid]
+            if not chunk:
+                continue
+        ids = [record.get(id_field) for record in chunk]
+        cleaned = clean_texts([record.get(text_field) for record in chunk], engine.max_text_chars)
+        yield ids, days.tolist(), engine.score_cleaned(cleaned)
+
+
+# ==========================================
+# 2. ROLLING PER-STUDENT AGGREGATE
+# ==========================================
+class RollingStress:
+    """Constant-memory rolling stress per student, independent of the order entries arrive in.
+
+    With ``window=None`` each student keeps an exponentially time-weighted
+    mean: an entry ``d`` days older than the student's newest one weighs
+    ``(1 - alpha) ** d``. With ``window=N`` they keep the mean of their N most
+    recent entries by date in a bounded heap.
+    """
+
+    def __init__(self, alpha=DEFAULT_ALPHA, window=None):
+        self.alpha = alpha
+        self.window = window
+        # student_id -> [newest day, weighted score sum, weight sum] with weights relative to
+        # the newest day, or a min-heap of the window's (day, score) pairs
+        self._state = {}
+        self._counts = {}
+
+    def update(self, student_id, day, score):
+        """Fold in one entry dated ``day`` (days since the epoch, see ``entry_days``)"""
+        if student_id is None:
+            return
+        day, score = float(day), float(score)
+        self._counts[student_id] = self._counts.get(student_id, 0) + 1
+        state = self._state.get(student_id)
+        if self.window is None:
+            if state is None:
+                self._state[student_id] = [day, score, 1.0]
+            elif day >= state[0]:
+                # Newer than anything seen: age the sums to the new day
+                decay = (1.0 - self.alpha) ** (day - state[0])
+                state[:] = [day, state[1] * decay + score, state[2] * decay + 1.0]
+            else:
+                weight = (1.0 - self.alpha) ** (state[0] - day)
+                state[1] += weight * score
+                state[2] += weight
+        else:
+            if state is None:
+                state = self._state[student_id] = []
+            if len(state) < self.window:
+                heapq.heappush(state, (day, score))
+            elif (day, score) > state[0]:
+                heapq.heapreplace(state, (day, score))
+
+    def update_many(self, student_ids, days, scores):
+        for student_id, day, score in zip(student_ids, days, scores):
+            self.update(student_id, day, score)
+
+    def value(self, student_id, default=None):
+        """Current rolling stress for one student"""
+        state = self._state.get(student_id)
+        if state is None:
+            return default
+        if self.window is None:
+            return state[1] / state[2]
+        return sum(score for _, score in state) / len(state)
+
+    def __len__(self):
+        return len(self._state)
+
+    def snapshot(self):
+        """DataFrame of ``student_id``, ``nlp_stress_score`` and ``entries``"""
+        ids = list(self._state)
+        return pd.DataFrame({
+            'student_id': ids,
+            'nlp_stress_score': [self.value(student_id) for student_id in ids],
+            'entries': [self._counts[student_id] for student_id in ids],
+        })
+
+    def attach(self, cohort, id_column='student_id', default=None):
+        """Copy of ``cohort`` with an ``nlp_stress_score`` column from the rolling values"""
+        out = cohort.copy()
+        out['nlp_stress_score'] = [self.value(student_id, default) for student_id in out[id_column]]
+        return out
+
+
+def ingest(engine, path, rolling, chunk_size=DEFAULT_CHUNK_SIZE, id_field='student_id', text_field='entry',
+           date_field='date'):
+    """Stream a JSONL file into ``rolling``; returns ingestion counters"""
+    stats = {'entries': 0, 'chunks': 0, 'malformed': 0}
+    chunks = read_jsonl_chunks(path, chunk_size, errors=stats)
+    for ids, days, scores in score_chunks(engine, chunks, id_field, text_field, date_field, errors=stats):
+        rolling.update_many(ids, days, scores)
+        stats['entries'] += len(ids)
+        stats['chunks'] += 1
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream journal entries into rolling per-student stress")
+    parser.add_argument('input', help="JSONL file of journal entries")
+    parser.add_argument('-o', '--output', help="CSV to write the per-student snapshot to")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                        help="EWMA weight lost per day of an entry's age")
+    parser.add_argument('--window', type=int, help="Use a mean over the N most recent entries instead of EWMA")
+    parser.add_argument('--id-field', default='student_id')
+    parser.add_argument('--text-field', default='entry')
+    parser.add_argument('--date-field', default='date')
+    args = parser.parse_args(argv)
+
+    engine = RiskEngine.load(args.model)
+    rolling = RollingStress(alpha=args.alpha, window=args.window)
+
+    start = time.perf_counter()
+    stats = ingest(engine, args.input, rolling, args.chunk_size, args.id_field, args.text_field, args.date_field)
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        rolling.snapshot().to_csv(args.output, index=False)
+
+    rate = stats['entries'] / elapsed if elapsed > 0 else float('inf')
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Ingested {stats['entries']:,} entries for {len(rolling):,} students in {elapsed:.2f}s "
+          f"({rate:,.0f} entries/s, {stats['malformed']} malformed, peak RSS {peak_mb:.0f} MB)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
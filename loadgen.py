@@ -0,0 +1,146 @@
+"""Load generator for score_server.py.
+
+Opens ``--concurrency`` keep-alive connections to a local scoring server and
+fires ``--requests`` single-student ``POST /score`` calls, reporting
+throughput and latency percentiles. ``--compare`` spawns the server twice,
+once with ``--max-batch 1`` (per-request scoring) and once with
+micro-batching, and prints both runs side by side.
+
+Usage:
+    python loadgen.py --port 8502 --requests 5000 --concurrency 64
+    python loadgen.py --compare --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from batch_score import synthetic_cohort
+from engine import MODEL_PATH, RAW_COLUMNS
+
+# Next to this file, so --compare works from any working directory
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'score_server.py')
+
+
+def make_payloads(n, seed=0):
+    """Encoded request bodies for ``n`` synthetic students"""
+    cohort = synthetic_cohort(n, seed=seed)
+    payloads = []
+    for record, journal in zip(cohort[RAW_COLUMNS].to_dict('records'), cohort['journal_entry']):
+        record = {col: value.item() if hasattr(value, 'item') else value for col, value in record.items()}
+        record['journal'] = journal
+        payloads.append(json.dumps(record).encode())
+    return payloads
+
+
+async def _client(host, port, payloads, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in payloads:
+            start = time.perf_counter()
+            writer.write(
+                b"POST /score HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b'HTTP/1.1 200'):
+                errors.append(head.split(b'\r\n', 1)[0].decode())
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, n_requests, concurrency):
+    """Throughput and latency stats for ``n_requests`` spread over ``concurrency`` connections"""
+    payloads = make_payloads(n_requests)
+    latencies, errors = [], []
+    shares = [payloads[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, share, latencies, errors) for share in shares if share])
+    elapsed = time.perf_counter() - start
+    ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+async def _wait_healthy(host, port, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            ok = (await reader.read()).startswith(b'HTTP/1.1 200')
+            writer.close()
+            if ok:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Scoring server on port {port} did not become healthy")
+
+
+def run_against_spawned(args, max_batch):
+    """Start score_server.py with ``max_batch``, run the load, then stop it"""
+    server = subprocess.Popen([
+        sys.executable, SERVER_SCRIPT, '--port', str(args.port), '--model', args.model,
+        '--max-batch', str(max_batch), '--max-wait-ms', str(args.max_wait_ms),
+    ])
+    try:
+        asyncio.run(_wait_healthy(args.host, args.port))
+        return asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_result(label, result):
+    print(f"{label:<22} {result['requests_per_s']:>9,.0f} req/s  p50 {result['p50_ms']:>7.1f} ms  "
+          f"p95 {result['p95_ms']:>7.1f} ms  p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive load against the local scoring server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--compare', action='store_true',
+                        help="Spawn the server per-request and micro-batched and compare")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model for --compare servers")
+    parser.add_argument('--max-batch', type=int, default=64, help="Batched server setting for --compare")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="Batched server setting for --compare")
+    args = parser.parse_args(argv)
+
+    if not args.compare:
+        print_result(f"{args.host}:{args.port}", asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency)))
+        return 0
+
+    per_request = run_against_spawned(args, max_batch=1)
+    batched = run_against_spawned(args, max_batch=args.max_batch)
+    print_result("per-request", per_request)
+    print_result(f"micro-batch <= {args.max_batch}", batched)
+    print(f"throughput gain: {batched['requests_per_s'] / per_request['requests_per_s']:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Background hot-reload of the scoring model.
+
+``ModelWatcher`` loads the model once, then polls the model file (or the
+bundle directory's ``manifest.json``) for a changed mtime/size. When a new
+file has been stable for one poll, it is loaded on the watcher thread:
+``RiskEngine`` validates the required components (``REQUIRED_KEYS`` for a
+pickle, the manifest's ``required_keys`` and checksums for a bundle
+directory), and a warmup prediction must produce a valid probability. Only
+then is the new engine swapped in, with a single attribute assignment.
+Callers read ``watcher.current`` once per request and keep that engine for
+the whole request, so nobody waits on a load or sees a half-built model. A
+candidate that fails to load is logged and skipped, and the old model keeps
+serving.
+
+With ``background=True`` the first load and warmup also run on the watcher
+thread, so a UI can render at once and call ``wait()`` only when a request
+actually needs the model. If that load fails, ``wait()`` raises its error
+until a later version loads; the thread keeps polling either way.
+``explain=True`` makes every warmup build the SHAP explainer as well, which
+is otherwise the largest cost of a first assessment (skipped for shared
+bundles, see ``warmup``).
+
+Replace models by writing the new file (or directory) next to the old one
+and renaming it into place; mapped bundle files that are rewritten in place
+can change under a running engine.
+
+Usage:
+    python model_reload.py student_risk_model.pkl --poll 2     # log swaps as they happen
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from engine import BUNDLE_DIR, MODEL_PATH, RAW_COLUMNS, RiskEngine
+from instrumentation import METRICS
+
+DEFAULT_POLL_SECONDS = 5.0
+
+# A typical student; the warmup runs the whole pipeline on it before a model goes live
+WARMUP_RAW = {
+    'previous_sem_gpa': 7.5, 'attendance_pct': 85, 'avg_daily_study_hours': 4,
+    'social_media_hours_per_day': 2.5, 'sleep_hours_avg': 7, 'last_test_score': 75,
+    'is_backlog': 0, 'avg_weekly_library_hours': 5, 'extracurricular_engagement_score': 6,
+}
+WARMUP_JOURNAL = "I feel overwhelmed with the upcoming exams but I am keeping up with my classes"
+
+logger = logging.getLogger(__name__)
+
+
+def model_source(model_path=MODEL_PATH, bundle_dir=BUNDLE_DIR):
+    """The bundle directory when it has been deployed, else the pickle (same preference as the app)"""
+    return bundle_dir if os.path.isdir(bundle_dir) else model_path
+
+
+def source_signature(path):
+    """``(mtime_ns, size)`` of the model file or bundle manifest, or None while it is missing"""
+    if os.path.isdir(path):
+        path = os.path.join(path, 'manifest.json')
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def warmup(engine, explain=False):
+    """Score the warmup student through every stage; raises if the result is not a probability.
+
+    ``explain`` also builds the engine's SHAP explainer and attributes the warmup student, except
+    for shared bundles: the explainer loads private XGBoost boosters, which would undo the
+    shared mode's memory saving in every worker, so there it is built on first use instead.
+    """
+    result = engine.score_one(WARMUP_RAW, WARMUP_JOURNAL)
+    batch = engine.score_many(pd.DataFrame([WARMUP_RAW] * 4, columns=RAW_COLUMNS).assign(journal_entry=WARMUP_JOURNAL))
+    for prob in [result['nlp_prob'], result['risk_prob']] + batch['risk_prob'].tolist():
+        if not (math.isfinite(prob) and 0.0 <= prob <= 1.0):
+            raise ValueError(f"Warmup produced an invalid probability: {prob!r}")
+    if explain and not engine.shared:
+        engine.explainer.drivers(result['features'])
+    return result
+
+
+def load_engine(path, cache_factory=None, explain=False):
+    """A validated, warmed-up engine for ``path``"""
+    engine = RiskEngine.load(path, compiled=True, cache=cache_factory() if cache_factory else None)
+    with METRICS.stage('warmup'):
+        warmup(engine, explain)
+    if engine.cache is not None:
+        # Drop the warmup student's entries
+        engine.cache.clear()
+    return engine
+
+
+class ModelWatcher:
+    """The live engine plus a daemon thread that swaps in new model versions"""
+
+    def __init__(self, path=None, poll_seconds=DEFAULT_POLL_SECONDS, cache_factory=None, on_swap=None,
+                 background=False, explain=False):
+        self.path = path or model_source()
+        self.poll_seconds = poll_seconds
+        self.cache_factory = cache_factory
+        self.on_swap = on_swap
+        self.explain = explain
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.started_at = time.time()
+        self.loaded_at = None
+        self.ready_at = None
+        self.first_result_at = None
+        # Why the first load failed; cleared once a later reload succeeds
+        self.load_error = None
+        # Set once the first load has finished, successfully or not
+        self._ready = threading.Event()
+
+        self._signature = source_signature(self.path)
+        self._pending = None
+        self._engine = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='model-watcher')
+            self._thread.start()
+            return
+        # Initial load runs on the caller's thread so startup errors surface there
+        self._initial_load()
+        if self.load_error is not None:
+            raise self.load_error
+        if poll_seconds:
+            self._thread = threading.Thread(target=self._watch, daemon=True, name='model-watcher')
+            self._thread.start()
+
+    def _initial_load(self):
+        try:
+            self._engine = load_engine(self.path, self.cache_factory, self.explain)
+            self.loaded_at = self.ready_at = time.time()
+        except Exception as e:
+            self.load_error = e
+        finally:
+            self._ready.set()
+
+    def _run(self):
+        self._initial_load()
+        if self.load_error is not None:
+            logger.error("Initial model load from %s failed: %s", self.path, self.load_error)
+        if self.poll_seconds:
+            # Keeps polling after a failed first load, so a fixed model still goes live
+            self._watch()
+
+    @property
+    def ready(self):
+        """True once the first load and warmup have finished (check ``load_error`` for failure)"""
+        return self._ready.is_set()
+
+    @property
+    def load_seconds(self):
+        """Seconds from construction until the first model was warmed up, or None"""
+        return None if self.ready_at is None else self.ready_at - self.started_at
+
+    def record_result(self):
+        """Note that a result was served; the first one is logged and reported as the ``first_result`` stage"""
+        if self.first_result_at is not None:
+            return
+        self.first_result_at = time.time()
+        seconds = self.first_result_at - self.started_at
+        if METRICS.enabled:
+            METRICS.observe('first_result', seconds)
+        logger.info("First result %.2fs after start (model ready after %.2fs)", seconds, self.load_seconds or 0.0)
+
+    def wait(self, timeout=None):
+        """The current engine, blocking until the first load finishes; re-raises its error"""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Model {self.path} still loading after {timeout}s")
+        if self.load_error is not None:
+            raise self.load_error
+        return self._engine
+
+    @property
+    def current(self):
+        """The engine to use for one request (read once, then keep it); None while the first load runs"""
+        return self._engine
+
+    @property
+    def model_version(self):
+        return None if self._engine is None else self._engine.model_version
+
+    def check(self):
+        """Reload if the model changed and has stayed unchanged for one poll; True when a new version went live"""
+        signature = source_signature(self.path)
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Still being written (or just appeared): wait for the next poll
+            self._pending = signature
+            return False
+        return self.reload(signature)
+
+    def reload(self, signature=None):
+        """Load, validate and warm up the model at ``path`` now, swapping it in on success"""
+        with self._lock:
+            self._signature = signature or source_signature(self.path)
+            self._pending = None
+            try:
+                engine = load_engine(self.path, self.cache_factory, self.explain)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("Model reload from %s failed, keeping %s: %s", self.path, self.model_version,
+                               self.last_error)
+                return False
+            if self._engine is not None and engine.model_version == self._engine.model_version:
+                return False
+            previous, self._engine = self._engine, engine
+            self.reloads += 1
+            self.loaded_at = time.time()
+            self.last_error = None
+            if self.load_error is not None:
+                # First successful load after a failed start
+                self.load_error = None
+                self.ready_at = self.loaded_at
+        logger.info("Model %s replaced %s", engine.model_version, previous and previous.model_version)
+        if self.on_swap is not None:
+            self.on_swap(engine)
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Model watcher check failed")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a model file and log hot-reloads")
+    parser.add_argument('model', nargs='?', help="Pickled bundle or bundle directory (default: what the app loads)")
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, help="Seconds between checks")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    watcher = ModelWatcher(args.model, poll_seconds=args.poll)
+    logger.info("Serving model %s from %s", watcher.model_version, watcher.path)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Collapsed linear fast path for the journal stress model.
+
+A ``TfidfVectorizer`` (l2 norm, raw term counts) followed by a binary
+``LogisticRegression`` is a weighted sum over tokens::
+
+    logit = intercept + sum(tf * idf * coef) / sqrt(sum((tf * idf) ** 2))
+
+``LinearTextScorer`` keeps ``idf`` and ``idf * coef`` per vocabulary term in
+one dict built at load time and scores an entry with a single
+tokenize-and-accumulate pass, without building a sparse matrix. It
+reproduces ``nlp_model.predict_proba(nlp_vectorizer.transform(...))[:, 1]``
+up to floating point summation order. ``MappedTextScorer`` computes the same
+score from sorted, memory-mappable term arrays for worker processes that
+should share one copy of the vocabulary.
+"""
+import math
+import re
+from collections import Counter
+from itertools import filterfalse
+
+import numpy as np
+
+
+class LinearTextScorer:
+    """Per-token weight table equivalent to the TF-IDF + logistic regression pair.
+
+    Unigrams are keyed by token and bigrams by ``(first, second)`` tuples,
+    each mapping to ``(idf, idf * coef)``. Counting, pairing and the
+    vocabulary intersection all run in C (``Counter``, ``zip``, set
+    operations), so Python only loops over the terms that actually hit.
+    """
+
+    def __init__(self, vocabulary, idf, coef, intercept, stop_words=(),
+                 token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 1), lowercase=True):
+        if tuple(ngram_range) not in ((1, 1), (1, 2), (2, 2)):
+            raise ValueError(f"Unsupported ngram_range: {ngram_range}")
+        self.unigrams, self.bigrams = {}, {}
+        for term, index in vocabulary.items():
+            entry = (float(idf[index]), float(idf[index] * coef[index]))
+            words = tuple(term.split(' '))
+            if len(words) == 1:
+                self.unigrams[term] = entry
+            else:
+                self.bigrams[words] = entry
+        self.intercept = float(intercept)
+        self.stop_words = frozenset(stop_words or ())
+        self.token_pattern = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self._unigram_keys = self.unigrams.keys() if self.ngram_range[0] == 1 else {}.keys()
+        self._bigram_keys = self.bigrams.keys() if self.ngram_range[1] == 2 else {}.keys()
+
+    @classmethod
+    def from_models(cls, vectorizer, model):
+        """Collapse a fitted ``TfidfVectorizer`` and binary ``LogisticRegression``"""
+        unsupported = {
+            'analyzer': vectorizer.analyzer != 'word',
+            'tokenizer': vectorizer.tokenizer is not None,
+            'preprocessor': vectorizer.preprocessor is not None,
+            'strip_accents': vectorizer.strip_accents is not None,
+            'norm': vectorizer.norm != 'l2',
+            'use_idf': not vectorizer.use_idf,
+            'sublinear_tf': vectorizer.sublinear_tf,
+            'binary': vectorizer.binary,
+            'classes': len(model.classes_) != 2,
+        }
+        rejected = [name for name, bad in unsupported.items() if bad]
+        if rejected:
+            raise ValueError(f"Cannot collapse vectorizer/model with settings: {rejected}")
+
+        return cls(
+            vectorizer.vocabulary_, vectorizer.idf_, model.coef_[0], model.intercept_[0],
+            stop_words=vectorizer.get_stop_words(), token_pattern=vectorizer.token_pattern,
+            ngram_range=vectorizer.ngram_range, lowercase=vectorizer.lowercase,
+        )
+
+    def logit(self, text):
+        """Decision function value for one (already cleaned) journal entry"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = list(filterfalse(self.stop_words.__contains__, self.token_pattern.findall(text)))
+
+        dot = norm = 0.0
+        for table, counts, keys in (
+            (self.unigrams, Counter(tokens), self._unigram_keys),
+            (self.bigrams, Counter(zip(tokens, tokens[1:])), self._bigram_keys),
+        ):
+            for term in counts.keys() & keys:
+                idf, weight = table[term]
+                count = counts[term]
+                tfidf = count * idf
+                norm += tfidf * tfidf
+                dot += count * weight
+        if norm == 0.0:
+            return self.intercept
+        return dot / math.sqrt(norm) + self.intercept
+
+    def score(self, text):
+        """Stress probability for one journal entry"""
+        return 1.0 / (1.0 + math.exp(-self.logit(text)))
+
+    def score_many(self, texts):
+        """Stress probabilities for many journal entries"""
+        logits = np.fromiter((self.logit(text) for text in texts), dtype=np.float64, count=len(texts))
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class MappedTextScorer:
+    """``LinearTextScorer`` over sorted term arrays instead of per-process dicts.
+
+    ``terms`` holds the vocabulary as UTF-8 bytes in sorted order (bigrams as
+    ``"first second"``) and ``weights`` the matching ``(idf, idf * coef)``
+    rows. Both can be memory-mapped from a bundle directory, so every worker
+    reads the same pages. Lookups are one ``searchsorted`` per batch.
+    """
+
+    def __init__(self, terms, weights, intercept, stop_words=(),
+                 token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 1), lowercase=True):
+        if tuple(ngram_range) not in ((1, 1), (1, 2), (2, 2)):
+            raise ValueError(f"Unsupported ngram_range: {ngram_range}")
+        self.terms = terms
+        self.weights = weights
+        self.intercept = float(intercept)
+        self.stop_words = frozenset(stop_words or ())
+        self.token_pattern = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+
+    @staticmethod
+    def sorted_arrays(vocabulary, idf, coef):
+        """``(terms, weights)`` arrays in the layout this scorer expects"""
+        encoded = [term.encode('utf-8') for term in vocabulary]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        index = np.asarray([vocabulary[term] for term in vocabulary], dtype=np.int64)[order]
+        terms = np.asarray([encoded[i] for i in order], dtype=bytes)
+        weights = np.column_stack([np.asarray(idf, dtype=np.float64)[index],
+                                   np.asarray(idf, dtype=np.float64)[index] * np.asarray(coef)[index]])
+        return terms, weights
+
+    def _grams(self, text):
+        """Counted unigram/bigram keys of one entry, as the vectorizer would produce them"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = list(filterfalse(self.stop_words.__contains__, self.token_pattern.findall(text)))
+        grams = tokens if self.ngram_range[0] == 1 else []
+        if self.ngram_range[1] == 2:
+            grams = grams + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        return Counter(grams)
+
+    def logits(self, texts):
+        """Decision function values for many (already cleaned) journal entries"""
+        rows, keys, counts = [], [], []
+        for row, text in enumerate(texts):
+            grams = self._grams(text)
+            rows += [row] * len(grams)
+            keys += grams.keys()
+            counts += grams.values()
+
+        out = np.full(len(texts), self.intercept)
+        width = self.terms.dtype.itemsize
+        # Longer keys cannot be vocabulary terms and would be truncated by the cast
+        hit = [len(key.encode('utf-8')) <= width for key in keys]
+        keys = np.asarray([key.encode('utf-8') for key, ok in zip(keys, hit) if ok], dtype=self.terms.dtype)
+        if not len(keys) or not len(self.terms):
+            return out
+        rows = np.asarray(rows, dtype=np.int64)[hit]
+        counts = np.asarray(counts, dtype=np.float64)[hit]
+
+        index = np.minimum(np.searchsorted(self.terms, keys), len(self.terms) - 1)
+        found = self.terms[index] == keys
+        rows, index, counts = rows[found], index[found], counts[found]
+        tfidf = counts * self.weights[index, 0]
+        norm = np.bincount(rows, tfidf * tfidf, minlength=len(texts))
+        dot = np.bincount(rows, counts * self.weights[index, 1], minlength=len(texts))
+        scored = norm > 0.0
+        out[scored] += dot[scored] / np.sqrt(norm[scored])
+        return out
+
+    def score(self, text):
+        """Stress probability for one journal entry"""
+        return float(self.score_many([text])[0])
+
+    def score_many(self, texts):
+        """Stress probabilities for many journal entries"""
+        return 1.0 / (1.0 + np.exp(-self.logits(texts)))
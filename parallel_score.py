@@ -0,0 +1,132 @@
+"""Multi-core cohort scoring over a forked process pool.
+
+The engine (and the cohort) are placed in module globals *before* the pool
+forks, so every worker inherits the loaded model copy-on-write instead of
+unpickling it again, and tasks only carry ``(start, stop)`` row ranges.
+Each worker scores its chunks independently with ``RiskEngine.score_many``
+and the results are merged back in input order. When the engine has a drift
+monitor, each worker counts into its own fresh copy and the parent merges
+the per-chunk counters.
+
+Usage:
+    python parallel_score.py --benchmark 200000        # speedup vs. worker count
+    python batch_score.py cohort.csv -o scores.csv --workers 8
+"""
+import argparse
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import pandas as pd
+
+from engine import DEFAULT_CHUNK_SIZE, MODEL_PATH, RiskEngine
+
+# Inherited by forked workers; set only for the lifetime of a pool
+_ENGINE = None
+_COHORT = None
+_TEXT_COLUMN = None
+
+
+def available_cpus():
+    """CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def single_threaded(engine):
+    """Keep XGBoost single-threaded inside a worker so processes don't oversubscribe cores"""
+    if engine.final_model is not None:
+        for calibrated in engine.final_model.calibrated_classifiers_:
+            calibrated.estimator.set_params(n_jobs=1)
+    compiled_model = engine.compiled_model
+    if compiled_model is not None and compiled_model.boosters:
+        for booster in compiled_model.boosters:
+            booster.set_param('nthread', 1)
+
+
+def _init_worker():
+    single_threaded(_ENGINE)
+    if _ENGINE.drift is not None:
+        from drift_monitor import DriftMonitor
+
+        # Counters go back to the parent per chunk; the worker never writes the state file
+        _ENGINE.drift = DriftMonitor(_ENGINE.drift.profile)
+
+
+def _score_range(bounds):
+    start, stop = bounds
+    scores = _ENGINE.score_many(_COHORT.iloc[start:stop], text_column=_TEXT_COLUMN)
+    if _ENGINE.drift is None:
+        return scores, None
+    state = _ENGINE.drift.state()
+    _ENGINE.drift.reset()
+    return scores, state
+
+
+def score_parallel(engine, cohort, workers=None, chunk_rows=None, text_column='journal_entry'):
+    """Score ``cohort`` across ``workers`` forked processes, preserving row order"""
+    global _ENGINE, _COHORT, _TEXT_COLUMN
+
+    workers = workers or available_cpus()
+    if workers <= 1 or len(cohort) == 0 or 'fork' not in mp.get_all_start_methods():
+        return engine.score_many(cohort, text_column=text_column)
+
+    # A few chunks per worker smooths out stragglers without much merge overhead
+    chunk_rows = chunk_rows or min(DEFAULT_CHUNK_SIZE, math.ceil(len(cohort) / (workers * 4)))
+    bounds = [(start, min(start + chunk_rows, len(cohort))) for start in range(0, len(cohort), chunk_rows)]
+
+    _ENGINE, _COHORT, _TEXT_COLUMN = engine, cohort, text_column
+    try:
+        with mp.get_context('fork').Pool(workers, initializer=_init_worker) as pool:
+            results = pool.map(_score_range, bounds)
+    finally:
+        _ENGINE = _COHORT = _TEXT_COLUMN = None
+    for _, state in results:
+        if state is not None:
+            engine.drift.merge(state)
+    return pd.concat([scores for scores, _ in results])
+
+
+def benchmark(engine, n_rows, worker_counts):
+    """Rows/s and speedup over one process for each worker count"""
+    from batch_score import synthetic_cohort
+
+    cohort = synthetic_cohort(n_rows, seed=1)
+    results, baseline = [], None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        score_parallel(engine, cohort, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        results.append({
+            'workers': workers,
+            'seconds': elapsed,
+            'rows_per_s': n_rows / elapsed,
+            'speedup': baseline / elapsed,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark process-pool cohort scoring")
+    parser.add_argument('--benchmark', type=int, default=100000, metavar='N', help="Synthetic rows to score")
+    parser.add_argument('--workers', type=int, nargs='+', help="Worker counts to try (default: 1, 2, 4, ... cores)")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    args = parser.parse_args(argv)
+
+    cpus = available_cpus()
+    worker_counts = args.workers or sorted({1, cpus} | {2 ** i for i in range(1, int(math.log2(cpus)) + 1)})
+    engine = RiskEngine.load(args.model)
+
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+    for row in benchmark(engine, args.benchmark, worker_counts):
+        print(f"{row['workers']:>7} {row['seconds']:>8.2f} {row['rows_per_s']:>10,.0f} {row['speedup']:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""Formatted HTML/PDF counseling packets for whole cohorts, rendered across a process pool.
+
+A packet holds the three documents the app offers as downloads (the full
+4-week report, the executive summary and the action items) for one student,
+as a self-contained HTML page and/or a PDF. The PDF writer is built in:
+Courier text pages with Flate-compressed content streams, so no PDF library
+is needed.
+
+The input is a cohort export, or ``batch_score.py`` output: when
+``risk_prob`` and ``nlp_stress_score`` are already there they are used as is
+and only the driver attribution runs. As in ``parallel_score``, the engine
+and the cohort are set as module globals before the pool forks. Workers
+score, explain and render fixed row ranges, and the parent writes each
+finished range into one zip archive in input order. At most two ranges per
+worker are in flight, so memory is bounded by the chunk size, not the cohort.
+
+Usage:
+    python report_packets.py scores.csv -o packets.zip --workers 0 --group-column section
+    python report_packets.py --synthetic 10000 -o packets.zip --formats pdf --workers 8
+"""
+import argparse
+import html
+import multiprocessing as mp
+import os
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from engine import MODEL_PATH, RiskEngine, calculate_features, prepare_raw, risk_level
+from parallel_score import available_cpus, single_threaded
+from report_templates import (DATE_FORMAT, MemberNames, driver_mask, plan_body, precompile, render_action_items,
+                              render_summary, report_header, safe_path_part)
+
+PACKET_FORMATS = ('html', 'pdf')
+DEFAULT_CHUNK_ROWS = 200
+# Ranges queued per worker; bounds how many rendered packets wait in the parent
+IN_FLIGHT_PER_WORKER = 2
+
+LEVEL_COLORS = {'HIGH': '#ef4444', 'MEDIUM': '#f97316', 'LOW': '#10b981'}
+
+# Inherited by forked workers; set only for the lifetime of a pool
+_ENGINE = None
+_COHORT = None
+_OPTIONS = None
+
+
+# ==========================================
+# 1. HTML
+# ==========================================
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Valkyrie AI Counseling Packet - {name}</title>
+<style>
+body {{ font-family: 'Inter', 'Segoe UI', sans-serif; color: #1f2937; max-width: 52rem; margin: 2rem auto; }}
+h1 {{ color: #2563eb; font-size: 1.5rem; margin-bottom: 0.25rem; }}
+h2 {{ color: #2563eb; font-size: 1.15rem; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.25rem; }}
+pre {{ font-family: 'JetBrains Mono', monospace; font-size: 0.8rem; line-height: 1.45; white-space: pre-wrap; }}
+table {{ border-collapse: collapse; margin: 1rem 0; }}
+td {{ padding: 0.2rem 1.5rem 0.2rem 0; }}
+.level {{ color: white; background: {color}; border-radius: 4px; padding: 0.1rem 0.5rem; font-weight: 600; }}
+section {{ page-break-before: always; }}
+</style>
+</head>
+<body>
+<h1>Valkyrie AI Professional Counseling Packet</h1>
+<table>
+<tr><td>Student</td><td><strong>{name}</strong></td></tr>
+<tr><td>Risk Level</td><td><span class="level">{level}</span></td></tr>
+<tr><td>Risk Score</td><td>{score}</td></tr>
+<tr><td>Generated</td><td>{date}</td></tr>
+<tr><td>Model Version</td><td>{model_version}</td></tr>
+</table>
+<h2>4-Week Transformation Plan</h2>
+<pre>{plan}</pre>
+<section>
+<h2>Executive Summary</h2>
+<pre>{summary}</pre>
+</section>
+<section>
+<h2>Action Items</h2>
+<ol>
+{actions}
+</ol>
+</section>
+</body>
+</html>
+"""
+
+# driver bitmask -> HTML-escaped plan body
+_HTML_BODIES = {}
+
+
+def render_html(risk_drivers, name, risk_prob, model_version, generated):
+    """Self-contained HTML packet: plan, executive summary and action items"""
+    mask = driver_mask(risk_drivers)
+    plan = _HTML_BODIES.get(mask)
+    if plan is None:
+        plan = _HTML_BODIES[mask] = html.escape(plan_body(risk_drivers).strip('\n'))
+    level = risk_level(risk_prob)
+    actions = [f"<li>{html.escape(driver)}</li>" for driver in risk_drivers] or ["<li>Maintain current excellence</li>"]
+    return HTML_TEMPLATE.format(
+        name=html.escape(name),
+        color=LEVEL_COLORS[level],
+        level=level,
+        score=f"{risk_prob:.1%}",
+        date=generated,
+        model_version=html.escape(str(model_version)),
+        plan=plan,
+        summary=html.escape(render_summary(risk_drivers, name, risk_prob, model_version, generated).strip('\n')),
+        actions="\n".join(actions),
+    )
+
+
+# ==========================================
+# 2. PDF
+# ==========================================
+PDF_PAGE_WIDTH = 612
+PDF_PAGE_HEIGHT = 792
+PDF_MARGIN = 48
+PDF_FONT_SIZE = 9
+PDF_LEADING = 11
+PDF_TITLE_SIZE = 13
+# Courier glyphs are 0.6 em wide
+PDF_LINE_CHARS = int((PDF_PAGE_WIDTH - 2 * PDF_MARGIN) / (0.6 * PDF_FONT_SIZE))
+PDF_PAGE_LINES = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN - 2 * PDF_TITLE_SIZE) // PDF_LEADING
+
+# The standard PDF fonts use WinAnsiEncoding, which has no box-drawing characters
+_PDF_TRANSLATE = str.maketrans({
+    '═': '=', '║': '|', '╔': '+', '╗': '+', '╚': '+', '╝': '+', '╠': '+', '╣': '+', '□': '[ ]',
+})
+
+
+def _pdf_string(text):
+    text = text.translate(_PDF_TRANSLATE).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('cp1252', errors='replace')
+
+
+def _pdf_lines(text):
+    """Wrapped, escaped and encoded lines of ``text``"""
+    lines = []
+    for line in text.strip('\n').splitlines() or ['']:
+        line = line.rstrip()
+        lines.extend(_pdf_string(line[i:i + PDF_LINE_CHARS]) for i in range(0, max(len(line), 1), PDF_LINE_CHARS))
+    return lines
+
+
+def _pdf_page(heading, lines):
+    top = PDF_PAGE_HEIGHT - PDF_MARGIN - PDF_TITLE_SIZE
+    stream = [b'BT /F2 %d Tf %d %d Td (' % (PDF_TITLE_SIZE, PDF_MARGIN, top), _pdf_string(heading), b') Tj ET\n',
+              b'BT /F1 %d Tf %d TL %d %d Td\n' % (PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, top - 2 * PDF_TITLE_SIZE)]
+    stream += [b'(%s) Tj T*\n' % line for line in lines]
+    stream.append(b'ET')
+    return zlib.compress(b''.join(stream))
+
+
+def pdf_document(sections, title=''):
+    """PDF bytes with each ``(heading, text)`` section starting on a new page.
+
+    ``text`` may also be a list of lines already passed through ``_pdf_lines``.
+    """
+    pages = []
+    for heading, text in sections:
+        lines = _pdf_lines(text) if isinstance(text, str) else text
+        for n, start in enumerate(range(0, len(lines), PDF_PAGE_LINES)):
+            pages.append(_pdf_page(heading if n == 0 else f"{heading} (continued)", lines[start:start + PDF_PAGE_LINES]))
+
+    # 1 catalog, 2 page tree, 3-4 fonts, 5 info, then a page and its content stream per page
+    kids = b' '.join(b'%d 0 R' % (6 + 2 * i) for i in range(len(pages)))
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(pages)),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Title (%s) /Producer (Valkyrie AI) >>' % _pdf_string(title),
+    ]
+    for i, content in enumerate(pages):
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>'
+                       % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, 7 + 2 * i))
+        objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(content), content))
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# driver bitmask -> encoded PDF lines of the plan body
+_PDF_BODIES = {}
+
+
+def render_pdf(risk_drivers, name, risk_prob, model_version, generated):
+    """PDF packet: report pages, then the executive summary and action items on their own pages"""
+    mask = driver_mask(risk_drivers)
+    body = _PDF_BODIES.get(mask)
+    if body is None:
+        body = _PDF_BODIES[mask] = _pdf_lines(plan_body(risk_drivers))
+    # Same text as render_report; only the header is encoded per student
+    report = _pdf_lines(report_header(name, risk_prob, generated)) + [b''] + body
+    return pdf_document([
+        ("Counseling Report", report),
+        ("Executive Summary", render_summary(risk_drivers, name, risk_prob, model_version, generated)),
+        ("Action Items", render_action_items(risk_drivers, name)),
+    ], title=f"Valkyrie AI Counseling Packet - {name}")
+
+
+# ==========================================
+# 3. PARALLEL RENDERING
+# ==========================================
+_RENDERERS = {'html': render_html, 'pdf': render_pdf}
+
+
+def packet_filename(name, fmt, date=None):
+    """Archive member name for one student's packet"""
+    return f"{safe_path_part(name)}_Valkyrie_Packet_{(date or datetime.now()).strftime('%Y%m%d')}.{fmt}"
+
+
+def render_packets(engine, cohort, formats=PACKET_FORMATS, name_column='name', text_column='journal_entry',
+                   group_column=None, approximate=False, explain_all=False, generated=None):
+    """``(member name, bytes)`` for every packet of a cohort slice, in row order (drivers as in ``cohort_reports``)"""
+    generated = generated or datetime.now()
+    date = generated.strftime(DATE_FORMAT)
+    if 'risk_prob' in cohort and 'nlp_stress_score' in cohort:
+        # Already scored (batch_score.py output); only the drivers are computed here
+        risk_probs = cohort['risk_prob'].to_numpy(dtype=np.float64)
+        nlp_scores = cohort['nlp_stress_score'].to_numpy(dtype=np.float64)
+    else:
+        scores = engine.score_many(cohort, text_column=text_column)
+        risk_probs = scores['risk_prob'].to_numpy()
+        nlp_scores = scores['nlp_stress_score'].to_numpy()
+    versions = cohort['model_version'] if 'model_version' in cohort else [engine.model_version] * len(cohort)
+    features = calculate_features(prepare_raw(cohort), nlp_scores)
+    if explain_all:
+        drivers = engine.explainer.drivers(features, approximate=approximate)
+    else:
+        drivers = engine.explainer.flagged_drivers(features, risk_probs, approximate=approximate)
+    names = cohort[name_column] if name_column in cohort else cohort['student_id']
+    groups = cohort[group_column] if group_column else [None] * len(cohort)
+
+    packets = []
+    for name, risk_prob, risk_drivers, version, group in zip(names, risk_probs, drivers, versions, groups):
+        name = str(name)
+        folder = '' if group is None else f"{safe_path_part(group)}/"
+        for fmt in formats:
+            data = _RENDERERS[fmt](risk_drivers, name, float(risk_prob), version, date)
+            packets.append((folder + packet_filename(name, fmt, generated),
+                            data.encode('utf-8') if isinstance(data, str) else data))
+    return packets
+
+
+def _init_worker():
+    single_threaded(_ENGINE)
+
+
+def _render_range(bounds):
+    start, stop = bounds
+    return render_packets(_ENGINE, _COHORT.iloc[start:stop], **_OPTIONS)
+
+
+def write_packet_archive(path, engine, cohort, formats=PACKET_FORMATS, workers=1, chunk_rows=DEFAULT_CHUNK_ROWS,
+                         compresslevel=1, **options):
+    """Render packets for ``cohort`` across ``workers`` forked processes into a zip; returns the packet count.
+
+    HTML members are deflated; PDFs are stored since their pages are already compressed.
+    Duplicate names get a numeric suffix instead of overwriting each other.
+    """
+    global _ENGINE, _COHORT, _OPTIONS
+
+    precompile()
+    # Built once here so forked workers inherit it instead of each building their own
+    engine.explainer
+    options = dict(options, formats=formats, generated=options.get('generated') or datetime.now())
+    bounds = [(start, min(start + chunk_rows, len(cohort))) for start in range(0, len(cohort), chunk_rows)]
+    members = MemberNames()
+    count = 0
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+        def write(packets):
+            nonlocal count
+            for filename, data in packets:
+                filename = members.unique(filename)
+                archive.writestr(filename, data,
+                                 compress_type=zipfile.ZIP_STORED if filename.endswith('.pdf') else None)
+                count += 1
+
+        workers = workers or available_cpus()
+        if workers <= 1 or len(bounds) <= 1 or 'fork' not in mp.get_all_start_methods():
+            for start, stop in bounds:
+                write(render_packets(engine, cohort.iloc[start:stop], **options))
+            return count
+
+        _ENGINE, _COHORT, _OPTIONS = engine, cohort, options
+        try:
+            with mp.get_context('fork').Pool(workers, initializer=_init_worker) as pool:
+                pending = deque()
+                for task in bounds:
+                    pending.append(pool.apply_async(_render_range, (task,)))
+                    if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                        write(pending.popleft().get())
+                while pending:
+                    write(pending.popleft().get())
+        finally:
+            _ENGINE = _COHORT = _OPTIONS = None
+    return count
+
+
+def main(argv=None):
+    from batch_score import read_table, synthetic_cohort
+
+    parser = argparse.ArgumentParser(description="Render HTML/PDF counseling packets for a cohort into a zip archive")
+    parser.add_argument('input', nargs='?', help="CSV/Parquet cohort export or batch_score.py output")
+    parser.add_argument('-o', '--output', required=True, help="Zip archive to write")
+    parser.add_argument('--formats', nargs='+', choices=PACKET_FORMATS, default=list(PACKET_FORMATS))
+    parser.add_argument('--workers', type=int, default=1, help="Render across this many forked processes (0 = all cores)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Students per worker task")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    parser.add_argument('--name-column', default='name', help="Column used for packet names (falls back to student_id)")
+    parser.add_argument('--group-column', help="Put each packet in a folder named by this column (e.g. section)")
+    parser.add_argument('--text-column', default='journal_entry')
+    parser.add_argument('--approximate', action='store_true', help="Faster approximate driver attribution")
+    parser.add_argument('--explain-all', action='store_true',
+                        help="Attribute drivers for every student, not only those at or above the decision threshold")
+    parser.add_argument('--synthetic', type=int, metavar='N', help="Generate N synthetic students instead of reading input")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        cohort = synthetic_cohort(args.synthetic)
+    elif args.input:
+        cohort = read_table(args.input)
+    else:
+        parser.error("an input file or --synthetic N is required")
+    if args.group_column and args.group_column not in cohort:
+        parser.error(f"--group-column {args.group_column!r} is not a column of the input")
+
+    engine = RiskEngine.load(args.model, compiled=True)
+    start = time.perf_counter()
+    count = write_packet_archive(args.output, engine, cohort, formats=args.formats, workers=args.workers,
+                                 chunk_rows=args.chunk_rows, name_column=args.name_column,
+                                 text_column=args.text_column, group_column=args.group_column,
+                                 approximate=args.approximate, explain_all=args.explain_all)
+    elapsed = time.perf_counter() - start
+
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"Wrote {count:,} packets for {len(cohort):,} students in {elapsed:.2f}s "
+          f"({len(cohort) / elapsed:,.0f} students/s, {count / elapsed:,.0f} packets/s); "
+          f"archive {size_mb:.1f} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Memoizing cache for single-student scoring.
+
+Counselors often resubmit nearly identical profiles, so ``ScoreCache``
+keeps two bounded LRU tables:
+
+* ``nlp``  - stress score keyed by a hash of the cleaned journal text, so a
+  slider tweak reuses the text result;
+* ``risk`` - final risk keyed by the exact engineered feature vector plus the
+  text hash.
+
+Name and student ID never reach the model, so they are not part of any key.
+Both tables honour an entry limit, an approximate memory cap and an optional
+TTL, and count hits, misses, evictions and expirations for tuning.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Fixed per-entry bookkeeping (OrderedDict node, tuple, float) on top of key/value sizes
+ENTRY_OVERHEAD = 120
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and byte budget"""
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        """Cached value for ``key`` (refreshing its recency), or ``default``"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, size, stored_at = entry
+            if self.ttl is not None and self.clock() - stored_at > self.ttl:
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store ``value`` and evict least recently used entries past the limits"""
+        size = sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size, self.clock())
+            self.bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ScoreCache:
+    """Separate NLP and risk caches sharing one memory budget"""
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=None):
+        per_table = None if max_bytes is None else max_bytes // 2
+        self.nlp = LRUCache(max_entries, per_table, ttl)
+        self.risk = LRUCache(max_entries, per_table, ttl)
+
+    @staticmethod
+    def text_key(cleaned_text):
+        """Compact digest of the cleaned journal text"""
+        return hashlib.blake2b(cleaned_text.encode('utf-8'), digest_size=16).digest()
+
+    @staticmethod
+    def risk_key(feature_row, text_key):
+        """Exact engineered feature vector (float64 bytes) plus the text digest"""
+        return feature_row.tobytes() + text_key
+
+    def clear(self):
+        self.nlp.clear()
+        self.risk.clear()
+
+    def stats(self):
+        return {'nlp': self.nlp.stats(), 'risk': self.risk.stats()}
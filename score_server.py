@@ -0,0 +1,246 @@
+"""Micro-batching asyncio scoring service on a local HTTP endpoint.
+
+Concurrent ``POST /score`` requests are gathered for up to ``max_wait_ms``
+(or until ``max_batch`` are waiting) and scored together with one
+``RiskEngine.score_many`` call, so hundreds of single-student requests per
+second cost a handful of batched model calls instead of one each.
+
+Request body (JSON): the raw sidebar columns plus an optional journal::
+
+    {"previous_sem_gpa": 7.5, "attendance_pct": 85, ..., "journal": "I feel overwhelmed"}
+
+Response: ``{"nlp_stress_score", "risk_prob", "risk_level", "model_version"}``.
+
+Usage:
+    python score_server.py --port 8502 --max-batch 64 --max-wait-ms 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from engine import MODEL_PATH, RAW_COLUMNS, RiskEngine
+from instrumentation import METRICS
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+# ==========================================
+# 1. MICRO-BATCHER
+# ==========================================
+class MicroBatcher:
+    """Collects scoring requests and runs them through the engine in batches"""
+
+    def __init__(self, engine, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        # One scoring thread: the event loop keeps accepting requests while a batch runs
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, record):
+        """Score one request record; resolves when its batch has been scored"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, records):
+        frame = pd.DataFrame(
+            {col: [record[col] for record in records] for col in RAW_COLUMNS}
+        )
+        frame['journal_entry'] = [record.get('journal', '') for record in records]
+        # Read once: a hot-reload may replace self.engine while this batch runs
+        return self.engine.score_many(frame)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            records = [record for record, _ in batch]
+            try:
+                scores = await loop.run_in_executor(self.executor, self._score, records)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), row in zip(batch, scores.itertuples(index=False)):
+                if not future.done():
+                    future.set_result({
+                        'nlp_stress_score': float(row.nlp_stress_score),
+                        'risk_prob': float(row.risk_prob),
+                        'risk_level': row.risk_level,
+                        'model_version': row.model_version,
+                    })
+
+
+# ==========================================
+# 2. MINIMAL HTTP/1.1 FRONT END
+# ==========================================
+def validate_record(record):
+    """Error message for a malformed scoring request, or None"""
+    if not isinstance(record, dict):
+        return "Request body must be a JSON object"
+    missing = [col for col in RAW_COLUMNS if col not in record]
+    if missing:
+        return f"Missing input columns: {missing}"
+    bad = [col for col in RAW_COLUMNS if not isinstance(record[col], (int, float)) or isinstance(record[col], bool)]
+    if bad:
+        return f"Non-numeric input columns: {bad}"
+    if not isinstance(record.get('journal', ''), str):
+        return "journal must be a string"
+    return None
+
+
+class ScoringServer:
+    """Routes ``POST /score``, ``GET /health``, ``GET /stats`` and ``GET /metrics``"""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+        else:
+            body, content_type = json.dumps(payload).encode(), 'application/json'
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok', 'model_version': self.batcher.engine.model_version}
+        if path == '/stats':
+            return 200, {'requests': self.batcher.requests, 'batches': self.batcher.batches}
+        if path == '/metrics':
+            return 200, METRICS.render()
+        if path != '/score':
+            return 404, {'error': f"No route for {path}"}
+        if method != 'POST':
+            return 405, {'error': "Use POST /score"}
+        try:
+            record = json.loads(body or b'null')
+        except ValueError:
+            return 400, {'error': "Body is not valid JSON"}
+        error = validate_record(record)
+        if error:
+            return 400, {'error': error}
+        return 200, await self.batcher.submit(record)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                method, path, version = (lines[0].split(' ') + ['', '', ''])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body's extent is unknown, so the connection cannot be reused
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self._route(method, path.split('?', 1)[0], body)
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+
+async def serve(engine, host='127.0.0.1', port=8502, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                watcher=None):
+    batcher = MicroBatcher(engine, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    if watcher is not None:
+        # New model versions go live from the next batch on
+        watcher.on_swap = lambda new_engine: setattr(batcher, 'engine', new_engine)
+    server = await asyncio.start_server(ScoringServer(batcher).handle, host, port)
+    print(f"Scoring on http://{host}:{port}/score (max_batch={max_batch}, max_wait_ms={max_wait_ms})",
+          file=sys.stderr, flush=True)
+    async with server:
+        await asyncio.gather(server.serve_forever(), batcher.run())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching HTTP scoring service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--model', default=MODEL_PATH, help="Model bundle to load")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="Most requests scored in one model call (1 = per-request scoring)")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="How long the first request in a batch waits for company")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Record per-stage timings and expose them on GET /metrics")
+    parser.add_argument('--reload-seconds', type=float, default=0,
+                        help="Watch --model and hot-swap new versions, checking this often (0 = off)")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        METRICS.enable()
+
+    watcher = None
+    if args.reload_seconds:
+        from model_reload import ModelWatcher
+
+        watcher = ModelWatcher(args.model, poll_seconds=args.reload_seconds)
+        engine = watcher.current
+    else:
+        engine = RiskEngine.load(args.model, compiled=True)
+    try:
+        asyncio.run(serve(engine, args.host, args.port, args.max_batch, args.max_wait_ms, watcher))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
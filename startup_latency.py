@@ -0,0 +1,118 @@
+"""Time to first assessment result in a fresh process, with and without background warmup.
+
+Each run starts a new interpreter that imports what the app imports, gets
+the model the way the app would, and then produces one full assessment the
+way ``run_assessment`` does: score, SHAP drivers, the what-if scenario and the
+report texts. The user submits ``--submit-after`` seconds after the process
+starts, as if filling in the form. Reported per mode, as the median of
+``--repeats`` runs:
+
+    first result   process start (spawn) until the result is ready
+    wait           submit until the result is ready (what the user sits through)
+
+Modes:
+    legacy       the old app: 2 s spinner sleep, load and warm up on the request
+                 thread, another 2 s sleep, then a cold first assessment
+    blocking     load and warm up on the request thread at submit, no sleeps
+    background   ModelWatcher(background=True, explain=True) started with the
+                 process; the submit waits only for what is left of the warmup
+
+Usage:
+    python startup_latency.py --repeats 5 --submit-after 0 3
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from model_reload import model_source
+
+MODES = ('legacy', 'blocking', 'background')
+
+_WORKER = """
+import time
+started = time.perf_counter()
+from counterfactual import minimal_change
+from engine import DECISION_THRESHOLD
+from model_reload import WARMUP_RAW, WARMUP_JOURNAL, ModelWatcher, load_engine
+from report_templates import precompile, render_action_items, render_report, render_summary
+
+# A student above the decision threshold, so the what-if search runs too
+RAW = dict(WARMUP_RAW, attendance_pct=45, sleep_hours_avg=4.5, last_test_score=40, is_backlog=1)
+JOURNAL = "Exhausted and anxious, I can't keep up with the backlog before exams"
+
+def assess(engine):
+    scored = engine.score_one(RAW, JOURNAL)
+    contributions = engine.explainer.category_contributions(scored['features'])
+    drivers = engine.explainer.drivers_from_contributions(contributions)[0]
+    if scored['risk_prob'] >= DECISION_THRESHOLD:
+        minimal_change(engine, RAW, scored['nlp_prob'])
+    render_report(drivers, 'Student', scored['risk_prob'])
+    render_summary(drivers, 'Student', scored['risk_prob'], scored['model_version'])
+    render_action_items(drivers, 'Student')
+
+precompile()
+{startup}
+time.sleep(max(0.0, started + {submit_after} - time.perf_counter()))
+submitted = time.perf_counter()
+{request}
+done = time.perf_counter()
+print(f"{{done - submitted:.6f}}", flush=True)
+"""
+
+_STARTUP = {
+    'legacy': "",
+    'blocking': "",
+    'background': "watcher = ModelWatcher({model!r}, poll_seconds=0, background=True, explain=True)",
+}
+
+_REQUEST = {
+    'legacy': "time.sleep(2)\nengine = load_engine({model!r})\ntime.sleep(2)\nassess(engine)",
+    'blocking': "engine = load_engine({model!r})\nassess(engine)",
+    'background': "assess(watcher.wait())",
+}
+
+
+def run_once(mode, model, submit_after):
+    """``(first_result_seconds, wait_seconds)`` for one fresh process"""
+    script = _WORKER.format(startup=_STARTUP[mode].format(model=model), submit_after=submit_after,
+                            request=_REQUEST[mode].format(model=model))
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', script], text=True, stdout=subprocess.PIPE)
+    line = proc.stdout.readline()
+    first_result = time.perf_counter() - start
+    if proc.wait() != 0 or not line:
+        raise RuntimeError(f"{mode} run exited with status {proc.returncode}")
+    return first_result, float(line)
+
+
+def measure(mode, model, submit_after, repeats):
+    """Median first-result and wait seconds over ``repeats`` fresh processes"""
+    runs = [run_once(mode, model, submit_after) for _ in range(repeats)]
+    return {
+        'first_result_s': statistics.median(first for first, _ in runs),
+        'wait_s': statistics.median(wait for _, wait in runs),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time to the first assessment result in a fresh process")
+    parser.add_argument('--model', default=None, help="Pickled bundle or bundle directory (default: what the app loads)")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--submit-after', type=float, nargs='+', default=[0.0, 3.0],
+                        help="Seconds after process start at which the user submits")
+    parser.add_argument('--repeats', type=int, default=3, help="Fresh processes per mode (median reported)")
+    args = parser.parse_args(argv)
+
+    model = args.model or model_source()
+    print(f"{'mode':<11} {'submit at':>9} {'first result':>13} {'wait':>8}  (median of {args.repeats}, {model})")
+    for submit_after in args.submit_after:
+        for mode in args.modes:
+            result = measure(mode, model, submit_after, args.repeats)
+            print(f"{mode:<11} {submit_after:>8.1f}s {result['first_result_s']:>12.2f}s {result['wait_s']:>7.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
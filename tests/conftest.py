@@ -0,0 +1,22 @@
+"""Shared fixtures; the modules under test live at the repository root."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def model_path():
+    """The committed pickled model bundle"""
+    return os.path.join(ROOT, 'student_risk_model.pkl')
+
+
+@pytest.fixture(scope='session')
+def engine(model_path):
+    """The committed model bundle, compiled as the CLIs load it"""
+    from engine import RiskEngine
+
+    return RiskEngine.load(model_path, compiled=True)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from batch_score import synthetic_cohort
+from cascade import reference_features
+from engine import DECISION_THRESHOLD
+from report_templates import cohort_reports
+
+
+def test_flagged_drivers_skips_rows_below_the_threshold(engine):
+    features = reference_features(engine, synthetic_cohort(200), 'journal_entry')
+    risk = engine.predict_risk(features)
+    flagged = risk >= DECISION_THRESHOLD
+    assert flagged.any() and not flagged.all()
+
+    drivers = engine.explainer.flagged_drivers(features, risk)
+    full = engine.explainer.drivers(features)
+    assert [d for d, f in zip(drivers, flagged) if f] == [d for d, f in zip(full, flagged) if f]
+    assert all(d == [] for d, f in zip(drivers, flagged) if not f)
+
+
+def test_cohort_reports_explains_everyone_only_on_request(engine):
+    cohort = synthetic_cohort(100)
+    default = list(cohort_reports(engine, cohort))
+    explained = list(cohort_reports(engine, cohort, explain_all=True))
+    low = np.array([risk < DECISION_THRESHOLD for _, risk, _ in default])
+    assert low.any()
+    assert all(drivers == [] for (_, _, drivers), is_low in zip(default, low) if is_low)
+    assert [row for row, is_low in zip(default, low) if not is_low] == \
+        [row for row, is_low in zip(explained, low) if not is_low]
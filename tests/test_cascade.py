@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from batch_score import synthetic_cohort
+from cascade import CUTS, CascadeScorer, above_cut, reference_features
+from engine import DECISION_THRESHOLD, HIGH_RISK, MEDIUM_RISK, risk_level
+
+
+@pytest.fixture(scope='module')
+def fitted(engine):
+    features = reference_features(engine, synthetic_cohort(400), 'journal_entry')
+    return CascadeScorer.fit(features, engine.predict_risk(features), bins=4), features
+
+
+@pytest.mark.parametrize('cut', [MEDIUM_RISK, HIGH_RISK])
+def test_band_cuts_match_risk_level(cut):
+    risk = np.array([np.nextafter(cut, 0.0), cut, np.nextafter(cut, 1.0)])
+    # risk_level puts a probability exactly on the edge in the lower band
+    assert above_cut(risk, cut).tolist() == [risk_level(r) != risk_level(cut) for r in risk] == [False, False, True]
+
+
+def test_decision_cut_flags_at_the_threshold():
+    assert above_cut(np.array([DECISION_THRESHOLD]), DECISION_THRESHOLD).tolist() == [True]
+
+
+@pytest.mark.parametrize('cut', CUTS[1:])
+def test_row_exactly_on_a_band_edge_widens_the_margin(fitted, cut):
+    scorer, features = fitted
+    # Stage one says just above the edge; the ensemble puts the row exactly on it, i.e. in the lower band
+    approx = np.full(len(features), cut + 0.01)
+    scorer.approx_risk = lambda rows: approx[:len(rows)]
+    try:
+        margin = scorer.calibrate_margin(features, np.full(len(features), cut), agreement=0.999)
+    finally:
+        del scorer.approx_risk
+    assert margin >= 0.01 - 1e-12
@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from batch_score import synthetic_cohort
+from cascade import reference_features
+from drift_monitor import DriftMonitor, build_profile
+
+
+@pytest.fixture(scope='module')
+def scored(engine):
+    features = reference_features(engine, synthetic_cohort(300), 'journal_entry')
+    return features, engine.predict_risk(features)
+
+
+@pytest.fixture(scope='module')
+def profile(scored):
+    return build_profile(*scored, bins=10)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_state_round_trips_through_the_file(profile, scored, tmp_path):
+    features, risk = scored
+    path = tmp_path / 'drift_state.json'
+    monitor = DriftMonitor(profile, state_path=str(path), save_every=10**9)
+    monitor.update(features, risk)
+    monitor.update(features.iloc[:1], risk[:1])
+    monitor.flush()
+
+    restored = DriftMonitor(profile, state_path=str(path))
+    assert restored.state() == monitor.state()
+    assert restored.snapshot()['columns'] == monitor.snapshot()['columns']
+
+
+def test_periodic_save_runs_off_the_calling_thread(profile, scored, tmp_path, monkeypatch):
+    features, risk = scored
+    path = tmp_path / 'drift_state.json'
+    monitor = DriftMonitor(profile, state_path=str(path), save_every=50)
+    writers = []
+    save_state = monitor.save_state
+    monkeypatch.setattr(monitor, 'save_state', lambda *a: (writers.append(threading.current_thread()), save_state(*a)))
+
+    monitor.update(features.iloc[:60], risk[:60])
+    _wait_for(lambda: path.exists() and json.loads(path.read_text())['rows'] == 60)
+    assert writers and threading.main_thread() not in writers
+
+
+def test_state_from_another_profile_is_discarded(profile, scored, tmp_path):
+    features, risk = scored
+    path = tmp_path / 'drift_state.json'
+    monitor = DriftMonitor(profile, state_path=str(path))
+    monitor.update(features, risk)
+    monitor.flush()
+
+    other = build_profile(features, risk, bins=4)
+    restored = DriftMonitor(other, state_path=str(path))
+    assert restored.rows == 0
+    assert all(stats['status'] == 'no data' for stats in restored.snapshot()['columns'].values())
+    assert all(count == 0 for count in restored.state()['missing'].values())
@@ -0,0 +1,20 @@
+import numpy as np
+
+from engine import HIGH_RISK, MEDIUM_RISK, risk_level
+from evaluate import evaluate
+
+
+def test_bands_and_band_thresholds_match_risk_level():
+    rng = np.random.default_rng(0)
+    # Rounded scores put many rows exactly on the 0.3 and 0.6 band edges
+    scores = np.round(rng.random(3000), 1)
+    labels = (rng.random(3000) < scores).astype(int)
+    report, _, _ = evaluate(labels, scores, resamples=20)
+
+    levels = np.array([risk_level(score) for score in scores])
+    for band in ('LOW', 'MEDIUM', 'HIGH'):
+        assert report['bands'][band]['rows'] == (levels == band).sum()
+    for name, cut in (('medium_band', MEDIUM_RISK), ('high_band', HIGH_RISK)):
+        entry = report['thresholds'][name]
+        assert entry['threshold'] == cut
+        assert np.isclose(entry['flagged_rate'], (scores > cut).mean())
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from batch_score import synthetic_cohort
+from incremental_score import fingerprints, rescore_incremental
+
+
+def _yes_no_cohort(n=40):
+    cohort = synthetic_cohort(n)
+    cohort['is_backlog'] = np.where(cohort['is_backlog'] == 1, 'Yes', 'No').astype(object)
+    return cohort
+
+
+def test_backlog_flip_changes_fingerprint():
+    cohort = _yes_no_cohort()
+    flipped = cohort.copy()
+    flipped.loc[3, 'is_backlog'] = 'No' if cohort.loc[3, 'is_backlog'] == 'Yes' else 'Yes'
+    changed = fingerprints(flipped) != fingerprints(cohort)
+    assert changed.tolist() == [i == 3 for i in range(len(cohort))]
+
+
+def test_yes_no_and_numeric_backlogs_fingerprint_alike():
+    cohort = _yes_no_cohort()
+    numeric = cohort.assign(is_backlog=(cohort['is_backlog'] == 'Yes').astype(int))
+    assert (fingerprints(cohort) == fingerprints(numeric)).all()
+
+
+def test_backlog_yes_to_no_is_rescored(engine):
+    cohort = _yes_no_cohort()
+    cohort.loc[:9, 'is_backlog'] = 'Yes'
+    table, _ = rescore_incremental(engine, cohort)
+
+    cohort.loc[:9, 'is_backlog'] = 'No'
+    updated, stats = rescore_incremental(engine, cohort, previous=table)
+    assert stats['rescored'] == 10
+    expected = engine.score_many(cohort.iloc[:10])['risk_prob'].to_numpy()
+    np.testing.assert_allclose(updated['risk_prob'].to_numpy()[:10], expected)
+
+
+def test_csv_round_trip_keeps_fingerprints(tmp_path):
+    cohort = synthetic_cohort(40)
+    cohort.to_csv(tmp_path / 'cohort.csv', index=False)
+    assert (fingerprints(pd.read_csv(tmp_path / 'cohort.csv')) == fingerprints(cohort)).all()
@@ -0,0 +1,49 @@
+import json
+import random
+
+import pytest
+
+from journal_stream import RollingStress, ingest
+
+ENTRIES = ["Feeling fine today", "Exhausted and anxious about exams", "Okay day, caught up on notes",
+           "Panicking about the backlog"]
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def _entries(n=60):
+    rng = random.Random(0)
+    return [json.dumps({'student_id': f"S{i % 5}", 'date': f"2024-03-{1 + i % 28:02d}", 'entry': rng.choice(ENTRIES)})
+            for i in range(n)]
+
+
+@pytest.mark.parametrize('bad_id', [None, [1], {'id': 1}, True, 1.5])
+def test_invalid_ids_are_malformed_not_fatal(engine, tmp_path, bad_id):
+    lines = _entries(10) + [json.dumps({'student_id': bad_id, 'date': "2024-03-02", 'entry': "hello"})]
+    rolling = RollingStress()
+    stats = ingest(engine, _write(tmp_path / 'entries.jsonl', lines), rolling, chunk_size=4)
+    assert stats['entries'] == 10
+    assert stats['malformed'] == 1
+    assert sum(rolling.snapshot()['entries']) == 10
+
+
+def test_non_object_and_undated_lines_are_malformed(engine, tmp_path):
+    lines = _entries(10) + ['[1]', '"x"', '{not json', json.dumps({'student_id': "S1", 'entry': "no date"})]
+    stats = ingest(engine, _write(tmp_path / 'entries.jsonl', lines), RollingStress())
+    assert (stats['entries'], stats['malformed']) == (10, 4)
+
+
+@pytest.mark.parametrize('window', [None, 5])
+def test_rolling_values_do_not_depend_on_line_order(engine, tmp_path, window):
+    lines = _entries()
+    snapshots = []
+    for seed in (1, 2):
+        random.Random(seed).shuffle(lines)
+        rolling = RollingStress(window=window)
+        ingest(engine, _write(tmp_path / f'entries_{seed}.jsonl', lines), rolling, chunk_size=7)
+        snapshots.append(rolling.snapshot().sort_values('student_id').reset_index(drop=True))
+    assert snapshots[0]['student_id'].tolist() == snapshots[1]['student_id'].tolist()
+    assert snapshots[0]['nlp_stress_score'].to_numpy() == pytest.approx(snapshots[1]['nlp_stress_score'].to_numpy())
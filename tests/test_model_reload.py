@@ -0,0 +1,25 @@
+import shutil
+import time
+
+import pytest
+
+from model_reload import ModelWatcher
+
+
+def test_background_watcher_recovers_after_a_failed_first_load(tmp_path, model_path):
+    path = tmp_path / 'student_risk_model.pkl'
+    watcher = ModelWatcher(str(path), poll_seconds=0.05, background=True)
+    try:
+        with pytest.raises(FileNotFoundError):
+            watcher.wait(timeout=30)
+
+        shutil.copy(model_path, path)
+        deadline = time.monotonic() + 60
+        while watcher.current is None:
+            assert time.monotonic() < deadline, "model never went live"
+            time.sleep(0.05)
+        assert watcher.load_error is None
+        assert watcher.wait(timeout=0) is watcher.current
+        assert watcher.load_seconds is not None
+    finally:
+        watcher.stop()
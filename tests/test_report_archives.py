@@ -0,0 +1,51 @@
+import zipfile
+
+from batch_score import synthetic_cohort
+from report_packets import write_packet_archive
+from report_templates import MemberNames, cohort_reports, safe_path_part, write_report_archive
+
+UNSAFE_NAMES = ['Ann Lee', 'Ann Lee', '../../etc/passwd', '/abs/path', '..', '.hidden', 'a\\b', '']
+
+
+def _cohort(names, **columns):
+    return synthetic_cohort(len(names)).assign(name=names, **columns)
+
+
+def _check_members(names):
+    assert len(set(names)) == len(names)
+    for name in names:
+        parts = name.split('/')
+        assert not name.startswith('/')
+        assert all(part and part not in ('.', '..') and not part.startswith('.') for part in parts)
+
+
+def test_safe_path_part():
+    assert safe_path_part('..') == '_'
+    assert safe_path_part('../x') == '_x'
+    assert safe_path_part('a/b c') == 'a_b_c'
+    assert safe_path_part('') == '_'
+
+
+def test_report_archive_member_names(engine, tmp_path):
+    path = tmp_path / 'reports.zip'
+    count = write_report_archive(path, cohort_reports(engine, _cohort(UNSAFE_NAMES)))
+    names = zipfile.ZipFile(path).namelist()
+    assert count == len(names) == len(UNSAFE_NAMES)
+    _check_members(names)
+    assert all('/' not in name for name in names)
+
+
+def test_member_names_skip_suffixes_taken_by_real_members():
+    members = MemberNames()
+    names = [members.unique(name) for name in ['a.txt', 'a.txt', 'a_1.txt', 'a.txt', 'a_1.txt']]
+    assert names == ['a.txt', 'a_1.txt', 'a_1_1.txt', 'a_2.txt', 'a_1_2.txt']
+
+
+def test_packet_archive_member_names(engine, tmp_path):
+    path = tmp_path / 'packets.zip'
+    groups = ['..', '.', '../x', 'a/b', '', 'sec 1', 'sec 1', '.hidden']
+    count = write_packet_archive(path, engine, _cohort(UNSAFE_NAMES, section=groups), formats=('html',),
+                                 group_column='section')
+    names = zipfile.ZipFile(path).namelist()
+    assert count == len(names) == len(UNSAFE_NAMES)
+    _check_members(names)
@@ -0,0 +1,140 @@
+"""Bulk journal text normalization with output identical to ``engine.clean_text``.
+
+``clean_text`` runs ``lower`` plus three ``re.sub`` passes per string, and
+batch jobs call it in a Python loop. ``clean_texts`` instead joins the
+ASCII texts of a batch with NUL separators and runs every pass once over
+the joined buffer: ``bytes.lower``, one URL regex, a single
+``bytes.translate`` that turns whitespace into spaces and deletes everything
+but letters, and one regex collapsing runs of spaces. It then splits the buffer back apart.
+Non-ASCII texts (where ``str.lower`` and Unicode whitespace matter) use
+precompiled per-text patterns with the same semantics.
+
+``max_chars`` truncates each text before cleaning, so one pasted multi-MB
+essay cannot stall a worker. Texts within the limit come out exactly as
+``clean_text`` would produce them.
+
+Usage:
+    python text_normalize.py --benchmark 1000000
+"""
+import argparse
+import re
+import sys
+import time
+
+# Longest journal entry the pipeline reads; the rest is dropped before cleaning
+MAX_TEXT_CHARS = 20000
+
+BATCH_TEXTS = 100000
+
+_SEP = '\x00'
+# str.isspace() characters in ASCII; Python's \s matches exactly these for str patterns
+_ASCII_SPACE = b'\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f '
+# One translate call maps every whitespace byte to a space and deletes all other non-letters
+_SPACE_TABLE = bytes(32 if c in _ASCII_SPACE else c for c in range(256))
+_DELETE = bytes(c for c in range(128) if not (97 <= c <= 122 or c in _ASCII_SPACE or c == 0))
+_URL_BYTES = re.compile(rb'http[^\t\n\x0b\x0c\r\x1c-\x1f \x00]+')
+# Only runs of two or more spaces need collapsing once all whitespace is a plain space
+_SPACE_RUN = re.compile(rb'  +')
+
+_URL = re.compile(r'http\S+')
+_NON_ALPHA = re.compile(r'[^a-z\s]+')
+
+
+def clean_one(text, max_chars=MAX_TEXT_CHARS):
+    """``clean_text`` for a single string, with the length guard"""
+    if not isinstance(text, str):
+        return ""
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+    text = text.lower()
+    if 'http' in text:
+        text = _URL.sub('', text)
+    # After lower() the only ASCII letters left are a-z
+    return ' '.join(_NON_ALPHA.sub('', text).split())
+
+
+def _clean_ascii_batch(texts):
+    """Clean NUL-free ASCII strings in one pass over their joined bytes"""
+    buffer = _SEP.join(texts).encode('ascii').lower()
+    if b'http' in buffer:
+        buffer = _URL_BYTES.sub(b'', buffer)
+    buffer = _SPACE_RUN.sub(b' ', buffer.translate(_SPACE_TABLE, _DELETE))
+    # Every whitespace run is now one space; drop those touching a separator or the ends
+    buffer = buffer.replace(b' \x00', b'\x00').replace(b'\x00 ', b'\x00').strip(b' ')
+    return buffer.decode('ascii').split(_SEP)
+
+
+def _clean_batch(texts):
+    """Clean one batch of strings; the ASCII ones share a single joined-buffer pass"""
+    joined = _SEP.join(texts)
+    if joined.isascii():
+        if joined.count(_SEP) == len(texts) - 1:
+            return _clean_ascii_batch(texts)
+        # A text contains the NUL separator itself
+        return [clean_one(text, None) for text in texts]
+
+    out = [clean_one(text, None) if not text.isascii() or _SEP in text else None for text in texts]
+    index = [i for i, text in enumerate(out) if text is None]
+    if index:
+        for i, text in zip(index, _clean_ascii_batch([texts[i] for i in index])):
+            out[i] = text
+    return out
+
+
+def clean_texts(texts, max_chars=MAX_TEXT_CHARS, batch_size=BATCH_TEXTS):
+    """Clean many journal entries; returns a list aligned with ``texts``"""
+    texts = texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    if max_chars is not None and texts and max(map(len, texts)) > max_chars:
+        texts = [text[:max_chars] for text in texts]
+
+    out = []
+    for start in range(0, len(texts), batch_size):
+        out += _clean_batch(texts[start:start + batch_size])
+    return out
+
+
+def clean_series(series, max_chars=MAX_TEXT_CHARS):
+    """``clean_texts`` for a pandas Series, keeping its index"""
+    import pandas as pd
+
+    return pd.Series(clean_texts(series.to_numpy(dtype=object), max_chars), index=series.index, dtype=object)
+
+
+def benchmark(n, seed=0):
+    """Texts/s for the per-text ``clean_text`` loop versus ``clean_texts``"""
+    import random
+
+    from batch_score import JOURNAL_SAMPLES
+    from engine import clean_text
+
+    rng = random.Random(seed)
+    extras = ["", " See https://uni.example/help?id=42", " Feeling 100% DONE!!!", "  \tNew line\nhere. "]
+    texts = [rng.choice(JOURNAL_SAMPLES) + rng.choice(extras) for _ in range(n)]
+
+    start = time.perf_counter()
+    reference = [clean_text(text) for text in texts]
+    loop_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cleaned = clean_texts(texts)
+    batch_seconds = time.perf_counter() - start
+
+    if cleaned != reference:
+        raise AssertionError("clean_texts output differs from clean_text")
+    return {'texts': n, 'loop_per_s': n / loop_seconds, 'batch_per_s': n / batch_seconds,
+            'speedup': loop_seconds / batch_seconds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk journal normalization against clean_text")
+    parser.add_argument('--benchmark', type=int, default=1000000, metavar='N', help="Synthetic journal entries")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.benchmark)
+    print(f"{result['texts']:,} texts: clean_text loop {result['loop_per_s']:,.0f}/s, "
+          f"clean_texts {result['batch_per_s']:,.0f}/s ({result['speedup']:.1f}x, identical output)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
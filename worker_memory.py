@@ -0,0 +1,113 @@
+"""Resident memory per worker process for each way of loading the model.
+
+Starts ``--workers`` independent interpreters per mode. Each one loads the
+model the way a Streamlit or server worker would, scores a single student
+and a 1,000-row batch, then waits. While they are all alive, the parent
+reads ``/proc/<pid>/smaps_rollup`` for each one and reports:
+
+    rss      resident pages, counting shared pages in full
+    pss      proportional share: shared pages divided by the processes mapping them
+    private  pages only this worker holds (what one more worker costs)
+
+Modes:
+    none     imports only (the interpreter, NumPy, pandas), no model
+    pickle   RiskEngine.load(student_risk_model.pkl, compiled=True)
+    bundle   RiskEngine.from_bundle_dir(student_risk_model/)
+    shared   RiskEngine.from_bundle_dir(student_risk_model/, shared=True)
+
+Linux only (reads /proc).
+
+Usage:
+    python worker_memory.py --workers 8
+    python worker_memory.py --workers 4 --modes pickle shared --bundle /srv/model/
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from engine import BUNDLE_DIR, MODEL_PATH
+
+MODES = ('none', 'pickle', 'bundle', 'shared')
+
+_LOADERS = {
+    'none': "engine = None",
+    'pickle': "engine = RiskEngine.load({model!r}, compiled=True)",
+    'bundle': "engine = RiskEngine.from_bundle_dir({bundle!r}, shared=False)",
+    'shared': "engine = RiskEngine.from_bundle_dir({bundle!r}, shared=True)",
+}
+
+_WORKER = """
+import sys
+from engine import RiskEngine
+from batch_score import synthetic_cohort
+cohort = synthetic_cohort(1000, seed=11)
+{loader}
+if engine is not None:
+    engine.score_many(cohort.iloc[:1])
+    engine.score_many(cohort)
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+
+def smaps_rollup(pid):
+    """Memory counters (kB) from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_mb': fields['Rss'] / 1024,
+        'pss_mb': fields['Pss'] / 1024,
+        'private_mb': (fields['Private_Clean'] + fields['Private_Dirty']) / 1024,
+    }
+
+
+def measure(mode, workers, model_path=MODEL_PATH, bundle_dir=BUNDLE_DIR):
+    """Per-worker memory counters for ``workers`` concurrent processes loading the model in ``mode``"""
+    script = _WORKER.format(loader=_LOADERS[mode].format(model=model_path, bundle=bundle_dir))
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    procs = [
+        subprocess.Popen([sys.executable, '-W', 'ignore', '-c', script], cwd=cwd, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for _ in range(workers)
+    ]
+    try:
+        for proc in procs:
+            if proc.stdout.readline().strip() != 'ready':
+                raise RuntimeError(f"{mode} worker exited with status {proc.wait()}")
+        samples = [smaps_rollup(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    per_worker = {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+    per_worker['total_pss_mb'] = sum(s['pss_mb'] for s in samples)
+    return per_worker
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare resident memory per worker across model loading modes")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent worker processes per mode")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--model', default=MODEL_PATH, help="Pickled bundle for the pickle mode")
+    parser.add_argument('--bundle', default=BUNDLE_DIR, help="Exported bundle directory for bundle/shared modes")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("worker_memory.py needs Linux /proc/<pid>/smaps_rollup", file=sys.stderr)
+        return 1
+
+    print(f"{'mode':<8} {'rss MB':>9} {'pss MB':>9} {'private MB':>11} {'total pss MB':>13}  ({args.workers} workers)")
+    for mode in args.modes:
+        result = measure(mode, args.workers, args.model, args.bundle)
+        print(f"{mode:<8} {result['rss_mb']:>9.1f} {result['pss_mb']:>9.1f} {result['private_mb']:>11.1f} "
+              f"{result['total_pss_mb']:>13.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())